@@ -1,5 +1,31 @@
 import sys
 import os
+import pytest
+from unittest.mock import DEFAULT, patch
 
 # Add the project root to sys.path so we can import modules
 sys.path.insert(0, os.path.abspath(os.path.dirname(__file__)))
+
+@pytest.fixture(autouse=True)
+def clear_client_cache():
+    # get_client() memoizes per API key; don't leak (mocked) clients between tests
+    from deep_research import get_client
+    get_client.cache_clear()
+    yield
+    get_client.cache_clear()
+
+@pytest.fixture
+def make_agent():
+    """Builds agents whose FileManager and SessionManager are mocks, so no history DB is opened."""
+    from deep_research import DeepResearchAgent, DeepResearchConfig
+
+    def make(**kwargs):
+        with patch.multiple("deep_research", FileManager=DEFAULT, SessionManager=DEFAULT):
+            return DeepResearchAgent(DeepResearchConfig(api_key="test"), **kwargs)
+    return make
+
+@pytest.fixture(scope="session", autouse=True)
+def _patched_genai():
+    # Patch the client class once per run; no test should reach the real SDK
+    with patch("google.genai.Client") as client_cls:
+        yield client_cls
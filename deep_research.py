@@ -22,9 +22,14 @@ if sys.prefix == sys.base_prefix and venv_python.exists():
 import time
 import argparse
 import json
+import hashlib
+import random
+import functools
 import re
+import socket
 import sqlite3
 import subprocess
+import threading
 import concurrent.futures
 import warnings
 import logging
@@ -36,15 +41,8 @@ logging.getLogger("google_genai").setLevel(logging.ERROR)
 from datetime import datetime
 from importlib.metadata import version, PackageNotFoundError
 from dotenv import load_dotenv
-from google import genai
-from pydantic import BaseModel, Field, ValidationError, field_validator
+from pydantic import BaseModel, ConfigDict, Field, ValidationError, field_validator
 from rich.console import Console
-from rich.markdown import Markdown
-from rich.table import Table
-from rich.panel import Panel
-from rich.tree import Tree
-from rich.prompt import Prompt
-from rich.terminal_theme import MONOKAI
 
 # Load environment variables
 load_dotenv()
@@ -60,6 +58,103 @@ load_dotenv(user_config_path)
 # Fallback version if not installed as a package
 __version__ = "0.13.1"
 
+# Upper bound on concurrent document deletions during store cleanup
+CLEANUP_WORKERS = 8
+
+# Streamed report text is buffered and written once this many characters accumulate (or on newline)
+STREAM_FLUSH_CHARS = 16384
+# ...but newline flushes are coalesced to at most one per this many seconds, so a logger
+# callback (e.g. one marshalling to a UI thread) sees a few writes per second, not one per line.
+# A held-back line is written by a timer when the interval ends, even if the stream goes quiet.
+STREAM_FLUSH_INTERVAL = 0.05
+
+# Cap (seconds) on the exponential backoff between stream reconnection attempts
+RECONNECT_MAX_DELAY = 60
+
+# Adaptive polling for background interactions: start fast, back off for long jobs
+POLL_INITIAL_DELAY = 1.0
+POLL_MAX_DELAY = 30.0
+POLL_BACKOFF = 1.5
+
+# Upper bound on threads sizing upload paths in `estimate`
+SIZE_WALK_WORKERS = 8
+
+# Most "?" parameters one SQLite statement accepts (the default limit was raised in 3.32)
+SQLITE_MAX_VARIABLES = 32766 if sqlite3.sqlite_version_info >= (3, 32, 0) else 999
+
+# --- Cost estimate model (`estimate`) ---
+# Gemini 3 Pro Pricing (Standard Context)
+COST_INPUT_1M = 2.00
+COST_OUTPUT_1M = 12.00
+# Per-token rates, folded once at import
+COST_PER_INPUT_TOKEN = COST_INPUT_1M / 1_000_000
+COST_PER_OUTPUT_TOKEN = COST_OUTPUT_1M / 1_000_000
+# Assumptions per Agent Node (Deep Research is token heavy)
+AVG_INPUT_TOKENS = 60_000  # Search results + web pages + internal thought trace
+AVG_OUTPUT_TOKENS = 4_000  # The Markdown report
+TOKENS_PER_BYTE = 0.25  # Approx 1 token = 4 bytes
+
+# Subcommands (and top-level flags) recognised by main(); anything else implies 'research'
+KNOWN_COMMANDS = frozenset({
+    "research", "start", "followup", "list", "show",
+    "delete", "cleanup", "tree", "auth", "estimate",
+    "-h", "--help", "-v", "--version"
+})
+
+# Rich style per session status in `tree`; anything else (running, cancelled, ...) is yellow
+_STATUS_STYLE = {"completed": "green", "crashed": "red", "failed": "red"}
+# Styled status markup rendered once per known status rather than per tree row
+_STATUS_MARKUP = {status: f"[{style}]{status}[/]" for status, style in _STATUS_STYLE.items()}
+
+def _status_markup(status: str) -> str:
+    return _STATUS_MARKUP.get(status) or f"[yellow]{status}[/]"
+
+# `list` flags every status that is neither finished nor in flight (failed, crashed, cancelled, ...) red
+_LIST_STATUS_MARKUP = {"completed": "[green]completed[/]", "running": "[yellow]running[/]"}
+
+# Whitespace that would break a single-line tree label
+_NL_TABLE = str.maketrans({'\n': ' ', '\r': ' ', '\t': ' '})
+
+def _label_prompt(prompt: str, width: int = 100) -> str:
+    """Single-line prompt for tree labels. Truncates before normalizing so long prompts cost O(width)."""
+    if len(prompt) > width:
+        return prompt[:width - 3].translate(_NL_TABLE) + "..."
+    return prompt.translate(_NL_TABLE)
+
+# Fixed prompt instructions, appended after the per-call content
+FILE_SEARCH_PRIORITY_INSTRUCTION = (
+    "IMPORTANT: You have access to a File Search Store containing uploaded documents. "
+    "You MUST search these files FIRST and prioritize their content over public web results. "
+    "If the answer is found in the uploaded files, cite them explicitly."
+)
+
+GAP_ANALYSIS_INSTRUCTIONS = (
+    "INSTRUCTIONS:\n"
+    "1. Analyze the report against the objective.\n"
+    "2. Identify 1-{limit} critical gaps, unanswered questions, or areas needing deeper verification.\n"
+    "3. If the report is comprehensive, return an empty list.\n"
+    "4. Output strictly a JSON list of strings, e.g., [\"Question 1\", \"Question 2\"].\n"
+    "5. Wrap the JSON in a ```json code block."
+)
+
+SYNTHESIS_INSTRUCTIONS = (
+    "INSTRUCTIONS:\n"
+    "1. Synthesize all information into a single, cohesive, comprehensive report.\n"
+    "2. Integrate the Deep Dive findings naturally into the narrative (do not just append them).\n"
+    "3. Resolve any conflicts between reports.\n"
+    "4. Maintain a professional, 'Deep Research' tone."
+)
+
+@functools.lru_cache(maxsize=4)
+def get_client(api_key: str):
+    """
+    Returns a shared genai.Client per API key.
+    Recursive runs build one agent per child thread; sharing the client lets
+    them reuse its HTTP connection pool instead of opening new TLS sessions.
+    """
+    from google import genai
+    return genai.Client(api_key=api_key)
+
 def get_version():
     try:
         return version("deepresearch")
@@ -94,14 +189,222 @@ def detach_process(args_list: list[str], log_path: str) -> int:
         )
         return proc.pid
 
+def _iter_sizes(path: str):
+    """
+    Yields the size of every file under a directory tree.
+    Uses os.scandir so sizes come from the cached DirEntry stat instead of a
+    separate os.path.getsize() call per file. Walks with an explicit stack
+    (and local aliases) so each size is yielded once rather than through a
+    chain of nested generators.
+    """
+    scandir = os.scandir
+    stack = [path]
+    pop, push = stack.pop, stack.append
+    while stack:
+        try:
+            entries = scandir(pop())
+        except OSError:
+            continue
+        with entries:
+            for entry in entries:
+                try:
+                    if entry.is_dir(follow_symlinks=False):
+                        push(entry.path)
+                    elif entry.is_file():
+                        yield entry.stat().st_size
+                except OSError:
+                    pass
+
+def _path_bytes(path: str) -> int:
+    """Total size of a file, or of every file under a directory; 0 for missing paths."""
+    if os.path.isdir(path):
+        return sum(_iter_sizes(path))
+    if os.path.isfile(path):
+        return os.path.getsize(path)
+    return 0
+
+class StatusBroadcaster:
+    """
+    Publishes the live status of a detached session over a Unix domain socket.
+    Each client connection receives a single JSON line and is then closed, so
+    `list` can ask a running process for its state instead of probing the PID.
+    """
+    def __init__(self, socket_path: str, session_id: int):
+        self.socket_path = socket_path
+        self.session_id = session_id
+        self.interaction_id = None
+        self.state = {"id": session_id, "status": "running"}
+        self._sock = None
+
+    def start(self) -> bool:
+        # AF_UNIX is unavailable on some platforms (e.g. Windows); fall back to the DB
+        if not hasattr(socket, "AF_UNIX"):
+            return False
+        try:
+            os.makedirs(os.path.dirname(self.socket_path), exist_ok=True)
+            if os.path.exists(self.socket_path):
+                os.remove(self.socket_path)
+            sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+            sock.bind(self.socket_path)
+            sock.listen()
+        except OSError:
+            return False
+        self._sock = sock
+        threading.Thread(target=self._serve, args=(sock,), daemon=True).start()
+        return True
+
+    def _serve(self, sock):
+        while True:
+            try:
+                conn, _ = sock.accept()
+            except OSError:
+                return
+            with conn:
+                try:
+                    conn.sendall((json.dumps(self.state) + "\n").encode())
+                except OSError:
+                    pass
+
+    def publish(self, status: str):
+        self.state = {"id": self.session_id, "status": status, "updated_at": datetime.now().isoformat()}
+
+    def close(self):
+        sock, self._sock = self._sock, None
+        if not sock:
+            return
+        try:
+            sock.shutdown(socket.SHUT_RDWR)
+        except OSError:
+            pass
+        sock.close()
+        self.unlink(self.socket_path)
+
+    @staticmethod
+    def unlink(socket_path: str | None):
+        """Removes a socket file, if there is one."""
+        if not socket_path:
+            return
+        try:
+            os.remove(socket_path)
+        except OSError:
+            pass
+
+    @staticmethod
+    def query(socket_path: str | None, timeout: float = 0.2) -> dict | None:
+        """Returns the published state, or None if no live process is listening."""
+        if not socket_path or not hasattr(socket, "AF_UNIX") or not os.path.exists(socket_path):
+            return None
+        try:
+            with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as sock:
+                sock.settimeout(timeout)
+                sock.connect(socket_path)
+                with sock.makefile("r") as reader:
+                    return json.loads(reader.readline())
+        except ConnectionRefusedError:
+            # Nobody is listening: the owner was killed before close() could clean up
+            StatusBroadcaster.unlink(socket_path)
+            return None
+        except (OSError, ValueError):
+            return None
+
+# --- SessionManager SQL ---
+# Hot statements are fixed strings, so each call hits the connection's statement cache
+# instead of re-assembling (and re-preparing) its SQL.
+# Every column except `result`, which can hold a multi-megabyte report.
+# `files` stays the JSON text written by create_session; readers that need the list decode it themselves.
+_SESSION_META_COLUMNS = "id, interaction_id, prompt, status, created_at, updated_at, files, pid, parent_id, depth"
+# `list` rows also skip `files`: neither the table nor the liveness checks read it
+_SQL_LIST = (
+    "SELECT id, interaction_id, prompt, status, created_at, updated_at, pid, parent_id, depth "
+    "FROM sessions ORDER BY updated_at DESC LIMIT ?"
+)
+# get_session lookups, keyed by (lookup column, include_result)
+_SQL_GET = {
+    ("id", False): f"SELECT {_SESSION_META_COLUMNS} FROM sessions WHERE id = ?",
+    ("id", True): "SELECT * FROM sessions WHERE id = ?",
+    ("interaction_id", False): f"SELECT {_SESSION_META_COLUMNS} FROM sessions WHERE interaction_id = ?",
+    ("interaction_id", True): "SELECT * FROM sessions WHERE interaction_id = ?",
+}
+_SQL_INSERT = (
+    "INSERT INTO sessions (interaction_id, prompt, status, created_at, updated_at, files, pid, parent_id, depth) "
+    "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)"
+)
+_SQL_UPDATE = "UPDATE sessions SET status = ?, updated_at = ? WHERE interaction_id = ?"
+_SQL_UPDATE_WITH_RESULT = "UPDATE sessions SET status = ?, updated_at = ?, result = ? WHERE interaction_id = ?"
+
+def _dict_row(cursor, row) -> dict:
+    """Row factory that builds each row straight into a dict, with no sqlite3.Row in between."""
+    return dict(zip([column[0] for column in cursor.description], row))
+
+@functools.lru_cache(maxsize=64)
+def _sql_parents_in(n: int) -> str:
+    """Parent-status lookup for n ids; built once per distinct n."""
+    return f"SELECT id, pid, status FROM sessions WHERE id IN ({','.join('?' * n)})"
+
+@functools.lru_cache(maxsize=64)
+def _sql_child_counts_in(n: int) -> str:
+    """Direct-child counts for n parent ids; built once per distinct n."""
+    return f"SELECT parent_id, COUNT(*) FROM sessions WHERE parent_id IN ({','.join('?' * n)}) GROUP BY parent_id"
+
+@functools.lru_cache(maxsize=64)
+def _sql_descendants_in(n: int) -> str:
+    """Recursive descendant walk from n parent ids; built once per distinct n."""
+    return f"""
+        WITH RECURSIVE sub(id, parent_id, status, prompt, depth) AS (
+            SELECT id, parent_id, status, prompt, depth FROM sessions WHERE parent_id IN ({','.join('?' * n)})
+            UNION ALL
+            SELECT s.id, s.parent_id, s.status, s.prompt, s.depth FROM sessions s JOIN sub ON s.parent_id = sub.id
+        )
+        SELECT * FROM sub ORDER BY parent_id, id
+    """
+
+# On-disk databases whose WAL switch and schema setup already ran in this process.
+# journal_mode=WAL persists in the file, so recursive runs (one manager per child agent)
+# only pay for _init_db once. In-memory databases vanish with their last connection,
+# so they are always initialized.
+_initialized_dbs = set()
+
 class SessionManager:
-    def __init__(self, db_path: str = user_db_path):
+    def __init__(self, db_path: str = user_db_path, connect=sqlite3.connect):
         self.db_path = db_path
-        self._init_db()
+        # Connection factory (sqlite3.connect signature); injectable so tests can wrap the connection
+        self._connect_fn = connect
+        # SQLite URI filenames (e.g. "file:x?mode=memory&cache=shared") have no directory to create
+        self._is_uri = db_path.startswith("file:")
+        if not self._is_uri and os.path.dirname(db_path):
+            os.makedirs(os.path.dirname(db_path), exist_ok=True)
+        # Set by the detached process that owns a session (see StatusBroadcaster)
+        self.broadcaster = None
+        # One long-lived autocommit connection serves every query, so calls skip connect/close
+        # (and the WAL/SHM churn that comes with it) and reuse prepared statements.
+        # Opened before _init_db so it also keeps shared-cache in-memory databases alive.
+        self.conn = self._connect(isolation_level=None, cached_statements=512, check_same_thread=False)
+        self.conn.row_factory = sqlite3.Row
+        self.conn.execute("PRAGMA synchronous=NORMAL;")
+        self.conn.execute("PRAGMA temp_store=MEMORY;")
+        self.conn.execute("PRAGMA mmap_size=268435456;")
+        # Serializes use of the shared connection across agent threads
+        self._conn_lock = threading.Lock()
+        if self._is_uri or db_path not in _initialized_dbs:
+            self._init_db()
+            if not self._is_uri:
+                _initialized_dbs.add(db_path)
+
+    def _connect(self, **kwargs) -> sqlite3.Connection:
+        return self._connect_fn(self.db_path, uri=self._is_uri, **kwargs)
+
+    def close(self):
+        self.conn.close()
+
+    def socket_path(self, session_id: int) -> str | None:
+        # Status sockets live next to an on-disk DB; URI (in-memory) databases have none
+        if self._is_uri:
+            return None
+        return os.path.join(os.path.dirname(self.db_path), "run", f"session_{session_id}.sock")
 
     def _init_db(self):
-        os.makedirs(os.path.dirname(self.db_path), exist_ok=True)
-        with sqlite3.connect(self.db_path) as conn:
+        with self._conn_lock:
+            conn = self.conn
             # Enable Write-Ahead Logging for concurrency
             conn.execute("PRAGMA journal_mode=WAL;")
             conn.execute("""
@@ -128,128 +431,212 @@ class SessionManager:
             if "depth" not in columns:
                 conn.execute("ALTER TABLE sessions ADD COLUMN depth INTEGER DEFAULT 1")
 
-            conn.commit()
+            # Serves child lookups (tree/show --recursive, the descendant walk) and, through its
+            # updated_at suffix, the recent-roots query in index order without a sort
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_sessions_roots ON sessions(parent_id, updated_at DESC)")
+            # Serves list_sessions (most recently updated first) without a full scan + sort
+            has_updated_idx = conn.execute(
+                "SELECT 1 FROM sqlite_master WHERE type = 'index' AND name = 'idx_sessions_updated'"
+            ).fetchone()
+            # IF NOT EXISTS: another process opening a fresh history may create it first
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_sessions_updated ON sessions(updated_at DESC)")
+            if not has_updated_idx:
+                # Refresh planner statistics once, so existing histories pick the new index up
+                conn.execute("ANALYZE sessions")
 
     def create_session(self, interaction_id: str, prompt: str, files: list[str] | None = None, pid: int | None = None, parent_id: int | None = None, depth: int = 1) -> int:
-        with sqlite3.connect(self.db_path) as conn:
-            cursor = conn.execute(
-                "INSERT INTO sessions (interaction_id, prompt, status, created_at, updated_at, files, pid, parent_id, depth) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+        with self._conn_lock:
+            cursor = self.conn.execute(
+                _SQL_INSERT,
                 (interaction_id, prompt, "running", datetime.now().isoformat(), datetime.now().isoformat(), json.dumps(files or []), pid, parent_id, depth)
             )
-            conn.commit()
-            print(f"[DB] Session saved (ID: {cursor.lastrowid})")
-            return cursor.lastrowid
+        print(f"[DB] Session saved (ID: {cursor.lastrowid})")
+        return cursor.lastrowid
 
     def update_session_pid(self, session_id: int, pid: int):
-        with sqlite3.connect(self.db_path) as conn:
-            conn.execute("UPDATE sessions SET pid = ? WHERE id = ?", (pid, session_id))
-            conn.commit()
+        with self._conn_lock:
+            self.conn.execute("UPDATE sessions SET pid = ? WHERE id = ?", (pid, session_id))
 
     def update_session_interaction_id(self, session_id: int, interaction_id: str):
-        with sqlite3.connect(self.db_path) as conn:
-            conn.execute(
+        with self._conn_lock:
+            self.conn.execute(
                 "UPDATE sessions SET interaction_id = ?, status = 'running', updated_at = ? WHERE id = ?",
                 (interaction_id, datetime.now().isoformat(), session_id)
             )
-            conn.commit()
+        if self.broadcaster and self.broadcaster.session_id == session_id:
+            self.broadcaster.interaction_id = interaction_id
+            self.broadcaster.publish("running")
 
     def update_session(self, interaction_id: str, status: str, result: str | None = None):
-        with sqlite3.connect(self.db_path) as conn:
-            query = "UPDATE sessions SET status = ?, updated_at = ?"
-            params = [status, datetime.now().isoformat()]
-            if result:
-                query += ", result = ?"
-                params.append(result)
-            query += " WHERE interaction_id = ?"
-            params.append(interaction_id)
-            
-            conn.execute(query, tuple(params))
-            conn.commit()
+        now = datetime.now().isoformat()
+        if result:
+            query, params = _SQL_UPDATE_WITH_RESULT, (status, now, result, interaction_id)
+        else:
+            query, params = _SQL_UPDATE, (status, now, interaction_id)
+
+        with self._conn_lock:
+            self.conn.execute(query, params)
+        if self.broadcaster and self.broadcaster.interaction_id == interaction_id:
+            self.broadcaster.publish(status)
 
     def append_to_result(self, interaction_id: str, new_content: str):
-        with sqlite3.connect(self.db_path) as conn:
-            # Get current result
-            row = conn.execute("SELECT result FROM sessions WHERE interaction_id = ?", (interaction_id,)).fetchone()
-            if row:
-                current_result = row[0] or ""
-                updated_result = f"{current_result}\n\n{new_content}"
-                conn.execute(
-                    "UPDATE sessions SET result = ?, updated_at = ? WHERE interaction_id = ?",
-                    (updated_result, datetime.now().isoformat(), interaction_id)
-                )
-                conn.commit()
+        # Appended in one statement: the connection autocommits, so a separate read + write could interleave
+        with self._conn_lock:
+            self.conn.execute(
+                "UPDATE sessions SET result = COALESCE(result, '') || ?, updated_at = ? WHERE interaction_id = ?",
+                (f"\n\n{new_content}", datetime.now().isoformat(), interaction_id)
+            )
 
     def get_children(self, session_id: int):
-        with sqlite3.connect(self.db_path) as conn:
-            conn.row_factory = sqlite3.Row
-            return conn.execute("SELECT * FROM sessions WHERE parent_id = ? ORDER BY id ASC", (session_id,)).fetchall()
+        with self._conn_lock:
+            return self.conn.execute("SELECT * FROM sessions WHERE parent_id = ? ORDER BY id ASC", (session_id,)).fetchall()
+
+    def child_counts(self, parent_ids: list[int]) -> dict[int, int]:
+        """
+        Returns {parent_id: number of direct children} in one grouped query per chunk,
+        so a "subtasks" column never costs a COUNT(*) per row. Childless ids are omitted.
+        """
+        counts = {}
+        with self._conn_lock:
+            for chunk in self._in_chunks(parent_ids):
+                counts.update(self._tuple_cursor().execute(_sql_child_counts_in(len(chunk)), chunk))
+        return counts
+
+    @staticmethod
+    def _in_chunks(ids, size: int | None = None):
+        """Splits ids into tuples small enough to bind as one IN (...) list."""
+        size = size or SQLITE_MAX_VARIABLES
+        ids = tuple(ids)
+        for start in range(0, len(ids), size):
+            yield ids[start:start + size]
+
+    def _tuple_cursor(self):
+        # Plain tuples for hot render paths: positional access, no sqlite3.Row wrapper
+        cursor = self.conn.cursor()
+        cursor.row_factory = None
+        return cursor
+
+    def get_descendants(self, session_ids: list[int]):
+        """
+        Returns all descendants of the given sessions in a single recursive query, ordered by (parent_id, id).
+        Rows are (id, parent_id, status, prompt, depth) tuples.
+        """
+        if not session_ids:
+            return []
+        rows = []
+        with self._conn_lock:
+            for chunk in self._in_chunks(session_ids):
+                rows += self._tuple_cursor().execute(_sql_descendants_in(len(chunk)), chunk).fetchall()
+        if len(session_ids) > SQLITE_MAX_VARIABLES:
+            # Each chunk is ordered on its own; restore the global order
+            rows.sort(key=lambda r: (r[1], r[0]))
+        return rows
+
+    def get_roots(self, limit: int = 10):
+        """
+        Returns the most recently updated root sessions.
+        Rows are (id, status, prompt, depth) tuples.
+        """
+        with self._conn_lock:
+            # Only the first 101 chars are needed to render (and detect truncation of) a tree label
+            return self._tuple_cursor().execute(
+                "SELECT id, status, substr(prompt, 1, 101), depth FROM sessions WHERE parent_id IS NULL ORDER BY updated_at DESC LIMIT ?",
+                (limit,)
+            ).fetchall()
+
+    @staticmethod
+    def _pid_alive(pid: int, probed: dict) -> bool:
+        """Signal-0 probe, memoized in `probed` so sessions sharing a PID cost one syscall per listing."""
+        alive = probed.get(pid)
+        if alive is None:
+            try:
+                os.kill(pid, 0)
+                alive = True
+            except OSError:
+                alive = False
+            probed[pid] = alive
+        return alive
 
     def list_sessions(self, limit: int = 10):
-        with sqlite3.connect(self.db_path) as conn:
-            conn.row_factory = sqlite3.Row
-            sessions = conn.execute("SELECT * FROM sessions ORDER BY updated_at DESC LIMIT ?", (limit,)).fetchall()
+        """
+        Returns the most recently updated sessions as dicts, built directly by the cursor
+        so a live or 'crashed' status can be written in place.
+        """
+        with self._conn_lock:
+            cursor = self.conn.cursor()
+            cursor.row_factory = _dict_row
+            sessions = cursor.execute(_SQL_LIST, (limit,)).fetchall()
+            # Prefetch the parents of running PID-less children in one query, not one per child
+            parent_ids = {s['parent_id'] for s in sessions if s['status'] == 'running' and not s['pid'] and s['parent_id']}
+            parents = {}
+            # Usually a single query; chunked only past SQLite's bound-variable limit
+            for chunk in self._in_chunks(parent_ids):
+                parents.update((p['id'], p) for p in self.conn.execute(_sql_parents_in(len(chunk)), chunk))
             
-            # Check for dead processes
-            result = []
-            for s in sessions:
-                s_dict = dict(s)
-                if s['status'] == 'running':
-                    is_dead = False
-                    
-                    # 1. Check own PID
-                    if s['pid']:
-                        try:
-                            os.kill(s['pid'], 0)
-                        except OSError:
+        # Check for dead processes (socket and PID probes run without holding the connection)
+        probed = {}
+        for s in sessions:
+            if s['status'] == 'running':
+                is_dead = False
+                
+                # 1. Ask the owning process directly, then fall back to the PID
+                if s['pid']:
+                    live = StatusBroadcaster.query(self.socket_path(s['id']))
+                    if live:
+                        s['status'] = live.get('status', s['status'])
+                    else:
+                        is_dead = not self._pid_alive(s['pid'], probed)
+                
+                # 2. Check Parent Status/PID (if child has no own PID)
+                elif s['parent_id']:
+                    # Recursive check up the chain? Or just direct parent?
+                    # Direct parent is usually the process owner for our architecture.
+                    parent = parents.get(s['parent_id'])
+                    if parent:
+                        # If parent is finished, child should be finished.
+                        if parent['status'] in ['completed', 'crashed', 'failed', 'cancelled']:
                             is_dead = True
-                    
-                    # 2. Check Parent Status/PID (if child has no own PID)
-                    elif s['parent_id']:
-                        # Recursive check up the chain? Or just direct parent?
-                        # Direct parent is usually the process owner for our architecture.
-                        parent = conn.execute("SELECT pid, status FROM sessions WHERE id = ?", (s['parent_id'],)).fetchone()
-                        if parent:
-                            # If parent is finished, child should be finished.
-                            if parent['status'] in ['completed', 'crashed', 'failed', 'cancelled']:
-                                is_dead = True
-                            # If parent is running but dead PID
-                            elif parent['pid']:
-                                try:
-                                    os.kill(parent['pid'], 0)
-                                except OSError:
-                                    is_dead = True
-                    
-                    if is_dead:
-                        s_dict['status'] = 'crashed'
-                        conn.execute("UPDATE sessions SET status = 'crashed' WHERE id = ?", (s['id'],))
-                        conn.commit()
-                        
-                result.append(s_dict)
-            return result
-
-    def get_session(self, session_id_or_interaction_id: str):
-        with sqlite3.connect(self.db_path) as conn:
-            conn.row_factory = sqlite3.Row
-            # Try as ID first
-            if str(session_id_or_interaction_id).isdigit():
-                return conn.execute("SELECT * FROM sessions WHERE id = ?", (session_id_or_interaction_id,)).fetchone()
-            # Try as interaction_id
-            return conn.execute("SELECT * FROM sessions WHERE interaction_id = ?", (session_id_or_interaction_id,)).fetchone()
+                        # If parent is running but dead PID
+                        elif parent['pid']:
+                            is_dead = not self._pid_alive(parent['pid'], probed)
+                
+                if is_dead:
+                    s['status'] = 'crashed'
+                    with self._conn_lock:
+                        self.conn.execute("UPDATE sessions SET status = 'crashed' WHERE id = ?", (s['id'],))
+        return sessions
+
+    def get_session(self, session_id_or_interaction_id: str, include_result: bool = False):
+        """
+        Looks a session up by numeric ID or interaction ID.
+        The report body (`result`) is only loaded when include_result is set.
+        """
+        # Try as ID first, then as interaction_id
+        column = "id" if str(session_id_or_interaction_id).isdigit() else "interaction_id"
+        with self._conn_lock:
+            return self.conn.execute(_SQL_GET[column, include_result], (session_id_or_interaction_id,)).fetchone()
 
     def delete_session(self, session_id_or_interaction_id: str) -> bool:
-        with sqlite3.connect(self.db_path) as conn:
+        with self._conn_lock:
             if str(session_id_or_interaction_id).isdigit():
-                cursor = conn.execute("DELETE FROM sessions WHERE id = ?", (session_id_or_interaction_id,))
+                ids = [int(session_id_or_interaction_id)]
+                cursor = self.conn.execute("DELETE FROM sessions WHERE id = ?", (session_id_or_interaction_id,))
             else:
-                cursor = conn.execute("DELETE FROM sessions WHERE interaction_id = ?", (session_id_or_interaction_id,))
-            conn.commit()
-            return cursor.rowcount > 0
+                ids = [row[0] for row in self.conn.execute("SELECT id FROM sessions WHERE interaction_id = ?", (session_id_or_interaction_id,))]
+                cursor = self.conn.execute("DELETE FROM sessions WHERE interaction_id = ?", (session_id_or_interaction_id,))
+            deleted = cursor.rowcount > 0
+        if deleted:
+            # A session's status socket goes with it (left behind if its process was killed)
+            for session_id in ids:
+                StatusBroadcaster.unlink(self.socket_path(session_id))
+        return deleted
 
 class DeepResearchConfig(BaseModel):
     api_key: str = Field(default_factory=lambda: os.getenv("GEMINI_API_KEY"), validate_default=True)
     agent_name: str = "deep-research-pro-preview-12-2025"
     followup_model: str = "gemini-3-pro-preview"
     recursion_timeout: int = 600 # 10 minutes per child task
+    poll_max_delay: float = Field(default=POLL_MAX_DELAY, gt=0) # Ceiling (seconds) on the adaptive status-poll interval
 
     @field_validator('api_key', mode='before')
     @classmethod
@@ -312,6 +699,9 @@ class DataExporter:
             print(f"[INFO] Report saved to {filepath}")
 
 class ResearchRequest(BaseModel):
+    # Reject unknown fields instead of silently collecting them
+    model_config = ConfigDict(extra='forbid')
+
     prompt: str
     stores: list[str] | None = None
     stream: bool = False
@@ -349,6 +739,8 @@ class ResearchRequest(BaseModel):
         return None
 
 class FollowUpRequest(BaseModel):
+    model_config = ConfigDict(extra='forbid')
+
     interaction_id: str
     prompt: str
 
@@ -421,35 +813,9 @@ class FileManager:
 
     def cleanup(self):
         console.print("\n[bold cyan][INFO][/] Cleaning up temporary resources...")
-        for store_name in self.created_stores:
-             try:
-                 # 1. Empty the store first
-                 if hasattr(self.client.file_search_stores, 'documents'):
-                     try:
-                         # List documents in the store
-                         pager = self.client.file_search_stores.documents.list(parent=store_name)
-                         for doc in pager:
-                             try:
-                                 console.print(f"[bold cyan][INFO][/] Deleting document: {doc.name}")
-                                 # Force delete to remove chunks/non-empty docs
-                                 self.client.file_search_stores.documents.delete(
-                                     name=doc.name,
-                                     config={'force': True}
-                                 )
-                             except Exception as e:
-                                 console.print(f"[bold yellow][WARN][/] Failed to delete document {doc.name}: {e}")
-                     except Exception as e:
-                         # If listing fails, we might just try deleting the store directly
-                         console.print(f"[bold yellow][WARN][/] Failed to list documents in {store_name}: {e}")
-
-                 # 2. Delete the store
-                 self.client.file_search_stores.delete(name=store_name)
-                 console.print(f"[bold cyan][INFO][/] Deleted store: {store_name}")
-             except Exception as e:
-                 if "non-empty" in str(e):
-                     console.print(f"[bold yellow][WARN][/] Could not delete store {store_name} (contains files). It will persist.")
-                 else:
-                     console.print(f"[bold yellow][WARN][/] Failed to delete store {store_name}: {e}")
+        with concurrent.futures.ThreadPoolExecutor(max_workers=CLEANUP_WORKERS) as pool:
+            for store_name in self.created_stores:
+                self._cleanup_store(store_name, pool)
 
         # Note: We don't need to delete 'uploaded_files' via client.files.delete() 
         # if they were uploaded via upload_to_file_search_store() as they are managed by the store?
@@ -464,14 +830,70 @@ class FileManager:
             except Exception:
                 pass
 
+    def _cleanup_store(self, store_name: str, pool: concurrent.futures.Executor):
+        try:
+            # 1. Empty the store first
+            if hasattr(self.client.file_search_stores, 'documents'):
+                try:
+                    # List documents in the store and force delete them concurrently
+                    # (force removes chunks/non-empty docs)
+                    pager = self.client.file_search_stores.documents.list(parent=store_name)
+                    futures = {}
+                    for doc in pager:
+                        console.print(f"[bold cyan][INFO][/] Deleting document: {doc.name}")
+                        future = pool.submit(
+                            self.client.file_search_stores.documents.delete,
+                            name=doc.name,
+                            config={'force': True}
+                        )
+                        futures[future] = doc.name
+                    for future in concurrent.futures.as_completed(futures):
+                        try:
+                            future.result()
+                        except Exception as e:
+                            console.print(f"[bold yellow][WARN][/] Failed to delete document {futures[future]}: {e}")
+                except Exception as e:
+                    # If listing fails, we might just try deleting the store directly
+                    console.print(f"[bold yellow][WARN][/] Failed to list documents in {store_name}: {e}")
+
+            # 2. Delete the store
+            self.client.file_search_stores.delete(name=store_name)
+            console.print(f"[bold cyan][INFO][/] Deleted store: {store_name}")
+        except Exception as e:
+            if "non-empty" in str(e):
+                console.print(f"[bold yellow][WARN][/] Could not delete store {store_name} (contains files). It will persist.")
+            else:
+                console.print(f"[bold yellow][WARN][/] Failed to delete store {store_name}: {e}")
+
 class DeepResearchAgent:
     def __init__(self, config: DeepResearchConfig | None = None, logger=None, quiet: bool = False):
         self.config = config or DeepResearchConfig()
-        self.client = genai.Client(api_key=self.config.api_key)
+        self.client = get_client(self.config.api_key)
         self.file_manager = FileManager(self.client)
         self.session_manager = SessionManager()
         self.logger = logger
         self.quiet = quiet
+        # Pending streamed text deltas (see _buffer_text)
+        self._out_buf = []
+        self._out_len = 0
+        self._out_flushed_at = 0.0
+        # Deadline flush for a held-back newline; the buffer is shared with it, hence the lock
+        self._out_timer = None
+        self._out_lock = threading.Lock()
+        # Stream event dispatch tables (see _process_stream)
+        self._handlers = {
+            "interaction.start": self._on_start,
+            "content.delta": self._on_delta,
+            "interaction.complete": self._on_done,
+            "error": self._on_done,
+        }
+        self._delta_handlers = {
+            "text": lambda delta: self._buffer_text(delta.text),
+            "thought_summary": self._on_thought,
+        }
+        # Gap questions already researched in this recursive run (shared with child agents)
+        self._seen_questions = set()
+        self._seen_lock = threading.Lock()
 
     def _log(self, message: str, end: str = "\n", **kwargs):
         """Internal logging helper that respects the custom logger."""
@@ -504,25 +926,76 @@ class DeepResearchAgent:
             else:
                 console.print(msg, end=end, highlight=False, **kwargs)
 
+    def _buffer_text(self, text: str):
+        """Queues a streamed text delta, writing in batches instead of once per token."""
+        with self._out_lock:
+            self._out_buf.append(text)
+            self._out_len += len(text)
+            if self._out_len >= STREAM_FLUSH_CHARS:
+                self._flush_locked()
+            elif "\n" in text:
+                wait = STREAM_FLUSH_INTERVAL - (time.monotonic() - self._out_flushed_at)
+                if wait <= 0:
+                    self._flush_locked()
+                elif self._out_timer is None:
+                    # Deep Research streams can pause for minutes; don't leave the line waiting on the next delta
+                    self._out_timer = threading.Timer(wait, self._flush_text)
+                    self._out_timer.daemon = True
+                    self._out_timer.start()
+
+    def _flush_text(self):
+        with self._out_lock:
+            self._flush_locked()
+
+    def _flush_locked(self):
+        if self._out_timer:
+            self._out_timer.cancel()
+            self._out_timer = None
+        if self._out_buf:
+            self._log("".join(self._out_buf), end="")
+            self._out_buf.clear()
+            self._out_len = 0
+            self._out_flushed_at = time.monotonic()
+
+    def _on_start(self, event, ctx: dict):
+        ctx['interaction_id'][0] = event.interaction.id
+        self._log(f"\n[INFO] Interaction started: {event.interaction.id}")
+        if ctx['adopt_session_id']:
+            self.session_manager.update_session_interaction_id(ctx['adopt_session_id'], event.interaction.id)
+        elif ctx['request_prompt']:
+            self.session_manager.create_session(event.interaction.id, ctx['request_prompt'], ctx['upload_paths'])
+
+    def _on_delta(self, event, ctx: dict):
+        handler = self._delta_handlers.get(event.delta.type)
+        if handler:
+            handler(event.delta)
+
+    def _on_thought(self, delta):
+        self._flush_text()
+        self._log(f"\n[THOUGHT] {delta.content.text}", flush=True)
+
+    def _on_done(self, event, ctx: dict):
+        ctx['is_complete'][0] = True
+
     def _process_stream(self, event_stream, interaction_id_ref: list, last_event_id_ref: list, is_complete_ref: list, request_prompt: str | None = None, upload_paths: list | None = None, adopt_session_id: int | None = None):
-        for event in event_stream:
-            if event.event_type == "interaction.start":
-                interaction_id_ref[0] = event.interaction.id
-                self._log(f"\n[INFO] Interaction started: {event.interaction.id}")
-                if adopt_session_id:
-                    self.session_manager.update_session_interaction_id(adopt_session_id, event.interaction.id)
-                elif request_prompt:
-                    self.session_manager.create_session(event.interaction.id, request_prompt, upload_paths)
-
-            if event.event_id:
-                last_event_id_ref[0] = event.event_id
-            if event.event_type == "content.delta":
-                if event.delta.type == "text":
-                    self._log(event.delta.text, end="")
-                elif event.delta.type == "thought_summary":
-                    self._log(f"\n[THOUGHT] {event.delta.content.text}", flush=True)
-            if event.event_type in ['interaction.complete', 'error']:
-                is_complete_ref[0] = True
+        ctx = {
+            'interaction_id': interaction_id_ref,
+            'is_complete': is_complete_ref,
+            'request_prompt': request_prompt,
+            'upload_paths': upload_paths,
+            'adopt_session_id': adopt_session_id,
+        }
+        handlers = self._handlers
+        try:
+            for event in event_stream:
+                handler = handlers.get(event.event_type)
+                if handler:
+                    handler(event, ctx)
+                if event.event_id:
+                    last_event_id_ref[0] = event.event_id
+        finally:
+            # Don't lose buffered text if the stream ends or drops mid-sentence
+            self._flush_text()
 
     def start_research_stream(self, request: ResearchRequest, auto_update_status: bool = True):
         agent_config = {
@@ -539,12 +1012,7 @@ class DeepResearchAgent:
                 request.stores.append(store_name)
                 
                 # FORCE PRIORITY
-                request.prompt = (
-                    f"{request.prompt}\n\n"
-                    "IMPORTANT: You have access to a File Search Store containing uploaded documents. "
-                    "You MUST search these files FIRST and prioritize their content over public web results. "
-                    "If the answer is found in the uploaded files, cite them explicitly."
-                )
+                request.prompt = f"{request.prompt}\n\n{FILE_SEARCH_PRIORITY_INSTRUCTION}"
             except Exception as e:
                 self._log(f"[ERROR] File upload failed: {e}")
                 self.file_manager.cleanup()
@@ -574,22 +1042,27 @@ class DeepResearchAgent:
             # Pass prompt for DB saving
             self._process_stream(initial_stream, interaction_id, last_event_id, is_complete, request.prompt, request.upload_paths, request.adopt_session_id)
             
-            # Reconnection Loop
+            # Reconnection Loop (exponential backoff with jitter, reset after a successful resume)
+            attempt = 0
             while not is_complete[0] and interaction_id[0]:
-                self._log(f"\n[INFO] Connection lost. Resuming from {last_event_id[0]}...")
-                time.sleep(2)
+                delay = min(RECONNECT_MAX_DELAY, 2 ** attempt) + random.uniform(0, 0.5)
+                self._log(f"\n[INFO] Connection lost. Resuming from {last_event_id[0]} in {delay:.1f}s...")
+                time.sleep(delay)
                 try:
                     resume_stream = self.client.interactions.get(
                         id=interaction_id[0], stream=True, last_event_id=last_event_id[0]
                     )
                     self._process_stream(resume_stream, interaction_id, last_event_id, is_complete, adopt_session_id=request.adopt_session_id)
+                    attempt = 0
                 except Exception as e:
+                    attempt += 1
                     self._log(f"[ERROR] Reconnection failed: {e}")
             
             if is_complete[0]:
                  self._log("\n[INFO] Research Complete.")
                  
-                 # Retrieve final text
+                 # Retrieve final text. This is the stream's only result write: deltas are
+                 # buffered for display (_buffer_text) and never persisted one by one.
                  if interaction_id[0]:
                      try:
                          final_interaction = self.client.interactions.get(id=interaction_id[0])
@@ -654,6 +1127,8 @@ class DeepResearchAgent:
             else:
                 self.session_manager.create_session(interaction.id, request.prompt, request.upload_paths)
 
+            # A ceiling below the initial delay applies from the first poll
+            poll_delay = min(self.config.poll_max_delay, POLL_INITIAL_DELAY)
             while True:
                 interaction = self.client.interactions.get(interaction.id)
                 if interaction.status == "completed":
@@ -686,7 +1161,8 @@ class DeepResearchAgent:
                 if not self.logger:
                     sys.stdout.write(".")
                     sys.stdout.flush()
-                time.sleep(10)
+                time.sleep(poll_delay)
+                poll_delay = min(self.config.poll_max_delay, poll_delay * POLL_BACKOFF)
         except KeyboardInterrupt:
             self._log("\n[WARN] Polling interrupted by user.")
             if 'interaction' in locals() and hasattr(interaction, 'id'):
@@ -725,12 +1201,7 @@ class DeepResearchAgent:
         prompt = (
             f"Original Objective: {original_prompt}\n\n"
             f"Report:\n{report_text}\n\n"
-            "INSTRUCTIONS:\n"
-            "1. Analyze the report against the objective.\n"
-            f"2. Identify 1-{limit} critical gaps, unanswered questions, or areas needing deeper verification.\n"
-            "3. If the report is comprehensive, return an empty list.\n"
-            "4. Output strictly a JSON list of strings, e.g., [\"Question 1\", \"Question 2\"].\n"
-            "5. Wrap the JSON in a ```json code block."
+            + GAP_ANALYSIS_INSTRUCTIONS.format(limit=limit)
         )
         
         try:
@@ -762,11 +1233,7 @@ class DeepResearchAgent:
             f"Objective: {original_prompt}\n\n"
             f"Initial Research Findings:\n{main_report}\n\n"
             f"Deep Dive Findings (Sub-Reports):\n{combined_subs}\n\n"
-            "INSTRUCTIONS:\n"
-            "1. Synthesize all information into a single, cohesive, comprehensive report.\n"
-            "2. Integrate the Deep Dive findings naturally into the narrative (do not just append them).\n"
-            "3. Resolve any conflicts between reports.\n"
-            "4. Maintain a professional, 'Deep Research' tone."
+            + SYNTHESIS_INSTRUCTIONS
         )
         
         try:
@@ -779,8 +1246,29 @@ class DeepResearchAgent:
             self._log(f"[ERROR] Synthesis failed: {e}")
             return main_report + "\n\n[ERROR: Synthesis failed. Appending raw sub-reports below]\n\n" + combined_subs
 
+    @staticmethod
+    def _question_key(question: str) -> str:
+        """Canonical fingerprint of a question, ignoring case, whitespace and trailing punctuation."""
+        canonical = " ".join(question.lower().split()).rstrip("?.! ")
+        return hashlib.blake2b(canonical.encode(), digest_size=8).hexdigest()
+
+    def _dedupe_questions(self, questions: list[str], indent: str = "") -> list[str]:
+        """Drops questions already claimed by another node of the current recursion tree."""
+        unique = []
+        with self._seen_lock:
+            for q in questions:
+                key = self._question_key(q)
+                if key in self._seen_questions:
+                    self._log(f"{indent}[INFO] Skipped duplicate question: {q}")
+                    continue
+                self._seen_questions.add(key)
+                unique.append(q)
+        return unique
+
     def start_recursive_research(self, request: ResearchRequest):
         """Entry point for recursive research."""
+        with self._seen_lock:
+            self._seen_questions = {self._question_key(request.prompt)}
         final_result = self._execute_recursion_level(
             prompt=request.prompt,
             current_depth=1,
@@ -828,7 +1316,7 @@ class DeepResearchAgent:
              interaction_id = self.start_research_poll(node_req, auto_update_status=is_leaf)
 
         # 3. Fetch Result
-        session = self.session_manager.get_session(interaction_id)
+        session = self.session_manager.get_session(interaction_id, include_result=True)
         
         # Robustness: If auto_update_status=False, status might be 'running' but result is ready.
         # We proceed if we have a result.
@@ -856,6 +1344,7 @@ class DeepResearchAgent:
         self._log(f"{indent}[INFO] Analyzing gaps...")
         questions = self.analyze_gaps(prompt, report, limit=breadth)
         self._log(f"{indent}[INFO] Gaps found: {len(questions)}")
+        questions = self._dedupe_questions(questions, indent)
         
         if not questions:
             # Recursion ends here (Leaf by logic)
@@ -902,8 +1391,20 @@ class DeepResearchAgent:
     def _run_recursive_child_safe(self, q, d, max_d, b, req, pid):
         # Helper to instantiate agent and run recursion in thread
         agent = DeepResearchAgent(config=self.config)
+        agent._seen_questions = self._seen_questions
+        agent._seen_lock = self._seen_lock
         return agent._execute_recursion_level(q, d, max_d, b, req, pid)
 
+def _positive_float(value: str) -> float:
+    """argparse type for intervals: a zero or negative wait would busy-poll or crash time.sleep."""
+    try:
+        number = float(value)
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"invalid number: {value!r}")
+    if not number > 0:
+        raise argparse.ArgumentTypeError(f"must be greater than 0, got {value}")
+    return number
+
 def main():
     desc = """
 Gemini Deep Research Agent CLI
@@ -964,6 +1465,7 @@ Set GEMINI_API_KEY in a local .env file or at ~/.config/deepresearch/.env
     parser_research.add_argument("--output", help="Save report to file (e.g., report.md, data.json)")
     parser_research.add_argument("--depth", type=int, default=1, help="Recursive research depth (default: 1)")
     parser_research.add_argument("--breadth", type=int, default=3, help="Max child tasks per recursion level (default: 3)")
+    parser_research.add_argument("--max-poll-interval", type=_positive_float, default=POLL_MAX_DELAY, metavar="SECONDS", help=f"Longest wait between status polls of a running task (default: {POLL_MAX_DELAY:g})")
     parser_research.add_argument("--adopt-session", type=int, help=argparse.SUPPRESS)
 
     # Command: start (Headless)
@@ -974,6 +1476,7 @@ Set GEMINI_API_KEY in a local .env file or at ~/.config/deepresearch/.env
     parser_start.add_argument("--output", help="Save report to file")
     parser_start.add_argument("--depth", type=int, default=1, help="Recursive research depth (default: 1)")
     parser_start.add_argument("--breadth", type=int, default=3, help="Max child tasks per recursion level (default: 3)")
+    parser_start.add_argument("--max-poll-interval", type=_positive_float, default=POLL_MAX_DELAY, metavar="SECONDS", help=f"Longest wait between status polls of a running task (default: {POLL_MAX_DELAY:g})")
 
     # Command: followup
     parser_followup = subparsers.add_parser("followup", help="Ask a follow-up question to a previous session")
@@ -1015,16 +1518,11 @@ Set GEMINI_API_KEY in a local .env file or at ~/.config/deepresearch/.env
 
     # Default Command Logic
     # If the first argument is not a known subcommand, assume 'research'.
-    known_commands = {
-        "research", "start", "followup", "list", "show", 
-        "delete", "cleanup", "tree", "auth", "estimate",
-        "-h", "--help", "-v", "--version"
-    }
-    
-    if len(sys.argv) > 1 and sys.argv[1] not in known_commands:
-        sys.argv.insert(1, "research")
+    argv = sys.argv[1:]
+    if argv and argv[0] not in KNOWN_COMMANDS:
+        argv = ["research"] + argv
 
-    args = parser.parse_args()
+    args = parser.parse_args(argv)
 
     if not args.command:
         parser.print_help()
@@ -1048,6 +1546,7 @@ Set GEMINI_API_KEY in a local .env file or at ~/.config/deepresearch/.env
             # Pass recursion params
             child_args += ["--depth", str(args.depth)]
             child_args += ["--breadth", str(args.breadth)]
+            child_args += ["--max-poll-interval", str(args.max_poll_interval)]
             
             # 3. Detach
             log_file = os.path.join(xdg_config_home, "deepresearch", "logs", f"session_{sid}.log")
@@ -1077,16 +1576,29 @@ Set GEMINI_API_KEY in a local .env file or at ~/.config/deepresearch/.env
                  # Let's keep it explicit.
                  pass
 
-            agent = DeepResearchAgent(quiet=args.quiet)
-            
-            if request.depth > 1:
-                if request.stream and not args.quiet:
-                    print("[INFO] Recursive research does not support streaming to stdout. Switching to polling mode.")
-                agent.start_recursive_research(request)
-            elif request.stream:
-                agent.start_research_stream(request)
-            else:
-                agent.start_research_poll(request)
+            # Recursive child agents inherit this config, poll ceiling included
+            agent = DeepResearchAgent(config=DeepResearchConfig(poll_max_delay=args.max_poll_interval), quiet=args.quiet)
+
+            # Detached children publish their status so `list` can query them live
+            broadcaster = None
+            if args.adopt_session:
+                mgr = agent.session_manager
+                broadcaster = StatusBroadcaster(mgr.socket_path(args.adopt_session), args.adopt_session)
+                if broadcaster.start():
+                    mgr.broadcaster = broadcaster
+
+            try:
+                if request.depth > 1:
+                    if request.stream and not args.quiet:
+                        print("[INFO] Recursive research does not support streaming to stdout. Switching to polling mode.")
+                    agent.start_recursive_research(request)
+                elif request.stream:
+                    agent.start_research_stream(request)
+                else:
+                    agent.start_research_poll(request)
+            finally:
+                if broadcaster:
+                    broadcaster.close()
 
         elif args.command == "followup":
             interaction_id = args.id
@@ -1113,6 +1625,7 @@ Set GEMINI_API_KEY in a local .env file or at ~/.config/deepresearch/.env
             mgr = SessionManager()
             sessions = mgr.list_sessions(args.limit)
             
+            from rich.table import Table
             table = Table(title="Recent Research Sessions", box=None)
             table.add_column("ID", style="cyan", no_wrap=True)
             table.add_column("Status")
@@ -1122,19 +1635,20 @@ Set GEMINI_API_KEY in a local .env file or at ~/.config/deepresearch/.env
             for s in sessions:
                 # Replace newlines for cleaner table but keep full length
                 prompt = s['prompt'].replace('\n', ' ')
-                
-                status_style = "green" if s['status'] == "completed" else "yellow" if s['status'] == "running" else "red"
-                status_text = f"[{status_style}]{s['status']}[/{status_style}]"
+                status_text = _LIST_STATUS_MARKUP.get(s['status']) or f"[red]{s['status']}[/]"
                 
                 table.add_row(str(s['id']), status_text, s['created_at'][:19], prompt)
             
             console.print(table)
 
         elif args.command == "show":
+            from rich.markdown import Markdown
+            from rich.panel import Panel
+            from rich.terminal_theme import MONOKAI
             mgr = SessionManager()
             
             def get_full_recursive_report(root_id, level=1):
-                session = mgr.get_session(root_id)
+                session = mgr.get_session(root_id, include_result=True)
                 if not session:
                     return ""
                 
@@ -1165,14 +1679,16 @@ Set GEMINI_API_KEY in a local .env file or at ~/.config/deepresearch/.env
                 if not full_content:
                     console.print(f"[bold red]Session {args.id} not found.[/]")
                 else:
-                    console.print(Markdown(full_content))
+                    # Parse once; the HTML export below renders the same document again
+                    report_md = Markdown(full_content)
+                    console.print(report_md)
                     if args.save:
                         if args.save.lower().endswith('.html'):
                             # For HTML, we render the Markdown to console (record=True) then save
                             # But wait, printing to console might be huge.
                             # We should use a separate console for saving.
                             save_console = Console(record=True)
-                            save_console.print(Markdown(full_content))
+                            save_console.print(report_md)
                             save_console.save_html(args.save, theme=MONOKAI)
                         else:
                             with open(args.save, 'w') as f:
@@ -1180,7 +1696,7 @@ Set GEMINI_API_KEY in a local .env file or at ~/.config/deepresearch/.env
                         console.print(f"[bold green]Recursive report saved to {args.save}[/]")
                 return
 
-            session = mgr.get_session(args.id)
+            session = mgr.get_session(args.id, include_result=True)
             
             # Use recording console if saving
             show_console = Console(record=True) if args.save else console
@@ -1224,7 +1740,7 @@ Set GEMINI_API_KEY in a local .env file or at ~/.config/deepresearch/.env
 
         elif args.command == "cleanup":
             config = DeepResearchConfig()
-            client = genai.Client(api_key=config.api_key)
+            client = get_client(config.api_key)
             
             console.print("[bold cyan][INFO][/] Scanning for File Search Stores...")
             # Note: client.file_search_stores.list() returns an iterator
@@ -1238,6 +1754,7 @@ Set GEMINI_API_KEY in a local .env file or at ~/.config/deepresearch/.env
                 console.print("[bold green]No active stores found. System is clean![/]")
                 return
 
+            from rich.table import Table
             table = Table(title=f"Found {len(stores)} Active Cloud Stores")
             table.add_column("Name (ID)", style="cyan")
             table.add_column("Create Time", style="dim")
@@ -1257,20 +1774,25 @@ Set GEMINI_API_KEY in a local .env file or at ~/.config/deepresearch/.env
                     console.print("[bold yellow]Aborted.[/]")
                     return
 
-            with console.status("Deleting stores...", spinner="dots"):
+            with console.status("Deleting stores...", spinner="dots"), \
+                 concurrent.futures.ThreadPoolExecutor(max_workers=CLEANUP_WORKERS) as pool:
                 for s in stores:
-                    # 1. Empty the store
+                    # 1. Empty the store (documents are deleted concurrently, bounded by the pool)
                     try:
                         if hasattr(client.file_search_stores, 'documents'):
                             docs = list(client.file_search_stores.documents.list(parent=s.name))
                             if docs:
                                 console.print(f"  Emptying {len(docs)} documents...")
-                            for doc in docs:
+                            # Force delete is required if document has content
+                            futures = {
+                                pool.submit(client.file_search_stores.documents.delete, name=doc.name, config={'force': True}): doc.name
+                                for doc in docs
+                            }
+                            for future in concurrent.futures.as_completed(futures):
                                 try:
-                                    # Force delete is required if document has content
-                                    client.file_search_stores.documents.delete(name=doc.name, config={'force': True})
+                                    future.result()
                                 except Exception as e:
-                                    console.print(f"  [yellow]Failed to delete doc {doc.name}: {e}[/]")
+                                    console.print(f"  [yellow]Failed to delete doc {futures[future]}: {e}[/]")
                     except Exception as e:
                         console.print(f"  [yellow]Failed to list docs: {e}[/]")
 
@@ -1284,20 +1806,22 @@ Set GEMINI_API_KEY in a local .env file or at ~/.config/deepresearch/.env
             console.print("[bold green]Cleanup Complete![/]")
 
         elif args.command == "tree":
+            from rich.tree import Tree
             mgr = SessionManager()
             
-            def build_tree(node_id, tree_node):
-                children = mgr.get_children(node_id)
-                for child in children:
-                    status_style = "green" if child['status'] == "completed" else "red" if child['status'] == "crashed" or child['status'] == "failed" else "yellow"
-                    # Clean prompt newlines but keep length
-                    prompt = child['prompt'].replace('\n', ' ')
-                    if len(prompt) > 100:
-                        prompt = prompt[:97] + "..."
-                    
-                    label = f"#{child['id']} [{status_style}]{child['status']}[/] [dim]Depth {child['depth']}[/]\n[italic]{prompt}[/]"
-                    branch = tree_node.add(label)
-                    build_tree(child['id'], branch)
+            def build_tree(branches):
+                # Fetch every descendant of the given nodes in one query, then attach in Python
+                children_by_parent = {}
+                for child in mgr.get_descendants(list(branches)):
+                    children_by_parent.setdefault(child[1], []).append(child)
+
+                def attach(node_id, tree_node):
+                    for child_id, _, status, prompt, depth in children_by_parent.get(node_id, ()):
+                        label = f"#{child_id} {_status_markup(status)} [dim]Depth {depth}[/]\n[italic]{_label_prompt(prompt)}[/]"
+                        attach(child_id, tree_node.add(label))
+
+                for node_id, tree_node in branches.items():
+                    attach(node_id, tree_node)
 
             if args.id:
                 root = mgr.get_session(args.id)
@@ -1306,27 +1830,21 @@ Set GEMINI_API_KEY in a local .env file or at ~/.config/deepresearch/.env
                     return
                 root_label = f"[bold cyan]Session #{root['id']}[/] [dim]Depth {root['depth']}[/]"
                 t = Tree(root_label)
-                build_tree(root['id'], t)
+                build_tree({root['id']: t})
                 console.print(t)
             else:
                 forest = Tree("[bold]Recent Research Trees[/]")
                 # Get recent roots
-                with sqlite3.connect(mgr.db_path) as conn:
-                    conn.row_factory = sqlite3.Row
-                    roots = conn.execute("SELECT * FROM sessions WHERE parent_id IS NULL ORDER BY updated_at DESC LIMIT 10").fetchall()
-                
-                for r in roots:
-                    status_style = "green" if r['status'] == "completed" else "red" if r['status'] == "crashed" or r['status'] == "failed" else "yellow"
-                    prompt = r['prompt'].replace('\n', ' ')
-                    if len(prompt) > 100:
-                        prompt = prompt[:97] + "..."
-                    
-                    label = f"#{r['id']} [{status_style}]{r['status']}[/]\n[italic]{prompt}[/]"
-                    branch = forest.add(label)
-                    build_tree(r['id'], branch)
+                branches = {}
+                for root_id, status, prompt, _ in mgr.get_roots(limit=10):
+                    label = f"#{root_id} {_status_markup(status)}\n[italic]{_label_prompt(prompt)}[/]"
+                    branches[root_id] = forest.add(label)
+                build_tree(branches)
                 console.print(forest)
 
         elif args.command == "auth":
+            from rich.panel import Panel
+            from rich.prompt import Prompt
             if args.action == "login":
                 console.print(Panel("Enter your Gemini API Key. It will be stored securely in `~/.config/deepresearch/.env`.", title="Authentication"))
                 key = Prompt.ask("API Key", password=True)
@@ -1348,46 +1866,32 @@ Set GEMINI_API_KEY in a local .env file or at ~/.config/deepresearch/.env
                     console.print("[yellow]Not logged in.[/]")
 
         elif args.command == "estimate":
-            # Gemini 3 Pro Pricing (Standard Context)
-            COST_INPUT_1M = 2.00
-            COST_OUTPUT_1M = 12.00
-            
-            # Assumptions per Agent Node (Deep Research is token heavy)
-            AVG_INPUT_TOKENS = 60_000  # Search results + web pages + internal thought trace
-            AVG_OUTPUT_TOKENS = 4_000  # The Markdown report
-            
             # Calculate File Tokens
-            file_tokens = 0
-            if args.upload:
-                for path in args.upload:
-                    try:
-                        if os.path.isdir(path):
-                            for root, _, files in os.walk(path):
-                                for f in files:
-                                    size = os.path.getsize(os.path.join(root, f))
-                                    file_tokens += size * 0.25 # Approx 1 token = 4 bytes
-                        else:
-                            size = os.path.getsize(path)
-                            file_tokens += size * 0.25
-                    except Exception:
-                        pass
+            # Paths are sized concurrently; scandir/stat release the GIL
+            paths = args.upload or ()
+            if len(paths) > 1:
+                with concurrent.futures.ThreadPoolExecutor(max_workers=min(SIZE_WALK_WORKERS, len(paths))) as executor:
+                    total_bytes = sum(executor.map(_path_bytes, paths))
+            else:
+                total_bytes = sum(map(_path_bytes, paths))
+            file_tokens = total_bytes * TOKENS_PER_BYTE
             
             # Calculate Total Nodes in Tree
             # Depth 1 = 1 node
             # Depth 2 = 1 + breadth
             # Depth 3 = 1 + breadth + breadth^2
-            total_nodes = 0
-            for d in range(args.depth):
-                nodes_at_level = pow(args.breadth, d)
-                total_nodes += nodes_at_level
+            # i.e. a geometric series: (breadth^depth - 1) / (breadth - 1)
+            b, d = args.breadth, max(args.depth, 0)
+            total_nodes = d if b == 1 else (b**d - 1) // (b - 1)
             
             # Total Tokens
             # Input: Each node reads standard context + uploaded files
             total_input = (total_nodes * AVG_INPUT_TOKENS) + (total_nodes * file_tokens)
             total_output = total_nodes * AVG_OUTPUT_TOKENS
             
-            cost = (total_input / 1_000_000 * COST_INPUT_1M) + (total_output / 1_000_000 * COST_OUTPUT_1M)
+            cost = total_input * COST_PER_INPUT_TOKEN + total_output * COST_PER_OUTPUT_TOKEN
             
+            from rich.table import Table
             table = Table(title="Cost Estimate (Gemini 3 Pro)")
             table.add_column("Metric", style="cyan")
             table.add_column("Value", style="bold yellow")
@@ -1401,7 +1905,7 @@ Set GEMINI_API_KEY in a local .env file or at ~/.config/deepresearch/.env
             table.add_row("Estimated Cost", f"${cost:.2f}")
             
             console.print(table)
-            console.print("[dim]Pricing: $2.00/1M Input, $12.00/1M Output. Actuals may vary based on search grounding.[/]")
+            console.print(f"[dim]Pricing: ${COST_INPUT_1M:.2f}/1M Input, ${COST_OUTPUT_1M:.2f}/1M Output. Actuals may vary based on search grounding.[/]")
 
         else:
             parser.print_help()
@@ -1,4 +1,4 @@
-from unittest.mock import patch
+from unittest.mock import Mock
 import pytest
 from deep_research import DeepResearchAgent, DeepResearchConfig, ResearchRequest, FollowUpRequest
 from pydantic import ValidationError
@@ -8,9 +8,11 @@ def mock_env_api_key(monkeypatch):
     monkeypatch.setenv("GEMINI_API_KEY", "fake_key")
 
 @pytest.fixture
-def mock_genai_client():
-    with patch("deep_research.genai.Client") as mock_client:
-        yield mock_client
+def mock_genai_client(monkeypatch):
+    # A fresh Mock per test is cheaper than reset_mock() walking the shared patch
+    client_cls = Mock()
+    monkeypatch.setattr("google.genai.Client", client_cls)
+    return client_cls
 
 def test_config_initialization(mock_env_api_key):
     """Test that the config initializes correctly with an API key."""
@@ -24,6 +26,12 @@ def test_config_missing_key(monkeypatch):
     with pytest.raises(ValidationError, match="GEMINI_API_KEY not found"):
         DeepResearchConfig()
 
+@pytest.mark.parametrize("delay", [0, -1])
+def test_config_rejects_non_positive_poll_delay(mock_env_api_key, delay):
+    """Test that the poll ceiling must be positive when set programmatically."""
+    with pytest.raises(ValidationError, match="poll_max_delay"):
+        DeepResearchConfig(poll_max_delay=delay)
+
 def test_research_request_validation():
     """Test valid research request creation."""
     req = ResearchRequest(prompt="Test Prompt", stream=True)
@@ -57,4 +65,16 @@ def test_agent_initialization(mock_env_api_key, mock_genai_client):
     """Test that the agent initializes correctly with a config."""
     agent = DeepResearchAgent()
     assert agent.config.api_key == "fake_key"
-    mock_genai_client.assert_called_once_with(api_key="fake_key")
\ No newline at end of file
+    mock_genai_client.assert_called_once_with(api_key="fake_key")
+
+def test_agent_client_shared(mock_env_api_key, mock_genai_client):
+    """Test that agents with the same API key reuse one client."""
+    first = DeepResearchAgent()
+    second = DeepResearchAgent()
+    assert first.client is second.client
+    mock_genai_client.assert_called_once_with(api_key="fake_key")
+
+def test_research_request_rejects_unknown_fields():
+    """Test that misspelled request fields fail validation."""
+    with pytest.raises(ValidationError):
+        ResearchRequest(prompt="Test Prompt", breath=2)
@@ -1,10 +1,13 @@
 from unittest.mock import MagicMock, patch
 import pytest
 import sys
-from deep_research import main, DeepResearchAgent
+import threading
+from deep_research import main, AVG_INPUT_TOKENS, AVG_OUTPUT_TOKENS, COST_PER_INPUT_TOKEN, COST_PER_OUTPUT_TOKEN
 
 @pytest.fixture
-def mock_agent_class():
+def mock_agent_class(monkeypatch):
+    # main() builds the (real) config the mocked agent is handed
+    monkeypatch.setenv("GEMINI_API_KEY", "test")
     with patch("deep_research.DeepResearchAgent") as mock_agent_cls:
         instance = mock_agent_cls.return_value
         instance.start_research_stream.return_value = "id_123"
@@ -25,13 +28,15 @@ def test_main_research_stream(mock_agent_class):
 
 def test_main_research_poll(mock_agent_class):
     """Test 'research' (polling) command invocation."""
-    test_args = ["deep_research.py", "research", "Topic"]
+    test_args = ["deep_research.py", "research", "Topic", "--max-poll-interval", "5"]
     with patch.object(sys, 'argv', test_args):
         main()
         
     mock_agent_class.return_value.start_research_poll.assert_called_once()
     args = mock_agent_class.return_value.start_research_poll.call_args[0][0]
     assert args.stream is False
+    # The ceiling goes into the validated config the agent is built with
+    assert mock_agent_class.call_args.kwargs['config'].poll_max_delay == 5.0
 
 def test_main_followup(mock_agent_class):
     """Test 'followup' command invocation."""
@@ -53,11 +58,11 @@ def test_main_upload_arg(mock_agent_class):
     args = mock_agent_class.return_value.start_research_poll.call_args[0][0]
     assert args.upload_paths == ["file1.pdf", "file2.txt"]
 
-def test_process_stream_output(capsys):
+def test_process_stream_output(make_agent, capsys):
     """Test _process_stream prints correctly."""
-    # We can test this by instantiating the real class with a mock client
+    # We can test this by instantiating the real class with mocked managers
     # but strictly testing the helper method
-    agent = DeepResearchAgent(MagicMock())
+    agent = make_agent()
     
     # Mock events
     event1 = MagicMock(event_type="content.delta")
@@ -102,7 +107,7 @@ def test_main_start_command(mock_mgr_cls, mock_detach):
     mock_mgr = mock_mgr_cls.return_value
     mock_mgr.create_session.return_value = 99
     
-    test_args = ["deep_research.py", "start", "Topic", "--upload", "doc.pdf"]
+    test_args = ["deep_research.py", "start", "Topic", "--upload", "doc.pdf", "--max-poll-interval", "5"]
     with patch.object(sys, 'argv', test_args):
         main()
         
@@ -119,4 +124,148 @@ def test_main_start_command(mock_mgr_cls, mock_detach):
     assert "99" in child_args
     assert "--upload" in child_args
     assert "doc.pdf" in child_args
+    assert child_args[child_args.index("--max-poll-interval") + 1] == "5.0"
     assert "session_99.log" in log_path
+
+@pytest.mark.parametrize("interval", ["0", "-1", "soon"])
+def test_main_rejects_bad_poll_interval(mock_agent_class, interval, capsys):
+    """A non-positive --max-poll-interval is a usage error, not a failed session."""
+    test_args = ["deep_research.py", "research", "Topic", "--max-poll-interval", interval]
+    with patch.object(sys, 'argv', test_args), pytest.raises(SystemExit) as exc:
+        main()
+
+    assert exc.value.code == 2
+    assert "--max-poll-interval" in capsys.readouterr().err
+    mock_agent_class.assert_not_called()
+
+def test_main_default_command(mock_agent_class):
+    """Test that a bare prompt falls back to the 'research' command."""
+    test_args = ["deep_research.py", "Topic"]
+    with patch.object(sys, 'argv', test_args):
+        main()
+        # argv is no longer mutated in place
+        assert sys.argv == test_args
+
+    mock_agent_class.return_value.start_research_poll.assert_called_once()
+    args = mock_agent_class.return_value.start_research_poll.call_args[0][0]
+    assert args.prompt == "Topic"
+
+@patch("deep_research.SessionManager")
+def test_main_list(mock_mgr_cls, capsys):
+    """Test 'list' renders one row per session with its status."""
+    mock_mgr_cls.return_value.list_sessions.return_value = [
+        {'id': 1, 'status': 'completed', 'created_at': '2025-01-01T10:00:00.000', 'prompt': 'First\nline'},
+        {'id': 2, 'status': 'cancelled', 'created_at': '2025-01-02T10:00:00.000', 'prompt': 'Second'},
+    ]
+
+    with patch.object(sys, 'argv', ["deep_research.py", "list", "--limit", "2"]):
+        main()
+
+    mock_mgr_cls.return_value.list_sessions.assert_called_once_with(2)
+    out = capsys.readouterr().out
+    assert "completed" in out and "cancelled" in out
+    assert "First line" in out
+    assert "2025-01-01T10:00:00" in out
+
+@patch("deep_research.SessionManager")
+def test_main_show_recursive_html_parses_once(mock_mgr_cls, tmp_path):
+    """Test 'show --recursive --save x.html' reuses one parsed Markdown document for screen and file."""
+    from rich.markdown import Markdown
+    mgr = mock_mgr_cls.return_value
+    mgr.get_session.return_value = {'id': 1, 'depth': 1, 'prompt': 'Topic', 'status': 'completed', 'result': 'Report'}
+    mgr.get_children.return_value = []
+    out_file = tmp_path / "report.html"
+
+    with patch.object(sys, 'argv', ["deep_research.py", "show", "1", "--recursive", "--save", str(out_file)]), \
+         patch("rich.markdown.Markdown", wraps=Markdown) as md_cls:
+        main()
+
+    assert md_cls.call_count == 1
+    assert "Report" in out_file.read_text()
+
+def test_main_estimate(tmp_path, capsys):
+    """Test 'estimate' node count and file token accounting."""
+    (tmp_path / "doc.txt").write_bytes(b"x" * 400)
+    test_args = ["deep_research.py", "estimate", "Topic", "--depth", "3", "--breadth", "2", "--upload", str(tmp_path)]
+    with patch.object(sys, 'argv', test_args):
+        main()
+
+    out = capsys.readouterr().out
+    assert "Total Agent Nodes" in out and " 7 " in out
+    assert "100 tokens" in out
+    cost = 7 * ((AVG_INPUT_TOKENS + 100) * COST_PER_INPUT_TOKEN + AVG_OUTPUT_TOKENS * COST_PER_OUTPUT_TOKEN)
+    assert f"${cost:.2f}" in out
+
+def _text_deltas(*texts):
+    """Stream events carrying one text delta each."""
+    events = []
+    for text in texts:
+        event = MagicMock(event_type="content.delta")
+        event.delta.type = "text"
+        event.delta.text = text
+        events.append(event)
+    return events
+
+def test_process_stream_buffers_text(make_agent):
+    """Test that text deltas are written in batches rather than per event."""
+    logged = []
+    agent = make_agent(logger=logged.append)
+
+    agent._process_stream(_text_deltas("Hel", "lo ", "world\n", "tail"), [None], [None], [False])
+
+    assert logged == ["Hello world\n", "tail"]
+
+def test_process_stream_coalesces_lines(make_agent):
+    """Test that newline flushes within STREAM_FLUSH_INTERVAL are merged into one write."""
+    logged = []
+    agent = make_agent(logger=logged.append)
+    stream = _text_deltas("one\n", "two\n", "three\n", "four\n")
+
+    # First line flushes; the next two land inside the interval; the fourth arrives after it
+    clock = iter([10.0, 10.0, 10.01, 10.02, 10.2, 10.2])
+    with patch("deep_research.time.monotonic", side_effect=lambda: next(clock)):
+        agent._process_stream(stream, [None], [None], [False])
+
+    assert logged == ["one\n", "two\nthree\nfour\n"]
+
+def test_process_stream_flushes_held_line_after_interval(make_agent):
+    """Test that a newline held back by the interval is written even if the stream goes quiet."""
+    logged = []
+    second_line = threading.Event()
+    agent = make_agent(logger=lambda msg: (logged.append(msg), len(logged) == 2 and second_line.set()))
+
+    def stream():
+        yield from _text_deltas("one\n", "two\n")
+        # The stream stalls here: "two" must arrive through the deadline timer, not the final flush
+        assert second_line.wait(timeout=5)
+        assert logged == ["one\n", "two\n"]
+
+    agent._process_stream(stream(), [None], [None], [False])
+
+    assert logged == ["one\n", "two\n"]
+
+def test_process_stream_does_not_write_deltas(make_agent):
+    """Test that streamed text never reaches the session DB per event."""
+    agent = make_agent(quiet=True)
+
+    agent._process_stream(_text_deltas(*["chunk one ", "chunk two\n"] * 50), [None], [None], [False])
+
+    agent.session_manager.update_session.assert_not_called()
+    agent.session_manager.append_to_result.assert_not_called()
+
+def test_process_stream_dispatch(make_agent):
+    """Test start/complete events update the refs and unknown events are ignored."""
+    agent = make_agent(quiet=True)
+
+    start = MagicMock(event_type="interaction.start", event_id="e1")
+    start.interaction.id = "int_1"
+    unknown = MagicMock(event_type="interaction.status_update", event_id="e2")
+    done = MagicMock(event_type="interaction.complete", event_id="e3")
+
+    interaction_id, last_event_id, is_complete = [None], [None], [False]
+    agent._process_stream([start, unknown, done], interaction_id, last_event_id, is_complete, request_prompt="Topic")
+
+    assert interaction_id == ["int_1"]
+    assert last_event_id == ["e3"]
+    assert is_complete == [True]
+    agent.session_manager.create_session.assert_called_once_with("int_1", "Topic", None)
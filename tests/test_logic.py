@@ -1,81 +1,130 @@
-from unittest.mock import MagicMock, patch
+from types import SimpleNamespace
+from unittest.mock import DEFAULT, MagicMock, Mock, patch
+import contextlib
 import pytest
 import os
-from deep_research import FileManager, DeepResearchAgent, ResearchRequest
+from deep_research import FileManager, DeepResearchAgent, ResearchRequest, _iter_sizes, _label_prompt
+
+class _FakeClient:
+    """Shallow stand-in for genai.Client: only the endpoints the agent calls."""
+    def __init__(self):
+        self._leaves = {
+            "create": Mock(), "list": Mock(), "delete_doc": Mock(), "delete": Mock(), "upload_to_store": Mock(),
+            "upload": Mock(), "get_file": Mock(), "delete_file": Mock(),
+            "create_interaction": Mock(), "get_interaction": Mock(), "generate_content": Mock(),
+        }
+        self.reset()
+
+    def reset(self):
+        """Clear call history and test overrides in place, so one instance can serve every test."""
+        leaf = self._leaves
+        for mock in leaf.values():
+            mock.reset_mock(return_value=True, side_effect=True)
+        leaf["create"].return_value = SimpleNamespace(name="stores/test-store")
+        leaf["list"].return_value = []
+        uploaded = SimpleNamespace(name="files/test-file", state=SimpleNamespace(name="ACTIVE"))
+        leaf["upload"].return_value = leaf["get_file"].return_value = uploaded
+        leaf["create_interaction"].return_value = []
+        # Rebuilt rather than reset, in case a test swapped out a whole namespace
+        self.file_search_stores = SimpleNamespace(
+            create=leaf["create"],
+            documents=SimpleNamespace(list=leaf["list"], delete=leaf["delete_doc"]),
+            delete=leaf["delete"],
+            upload_to_file_search_store=leaf["upload_to_store"],
+        )
+        self.files = SimpleNamespace(upload=leaf["upload"], get=leaf["get_file"], delete=leaf["delete_file"])
+        self.interactions = SimpleNamespace(create=leaf["create_interaction"], get=leaf["get_interaction"])
+        self.models = SimpleNamespace(generate_content=leaf["generate_content"])
+
+@pytest.fixture(scope="session")
+def _client_template():
+    return _FakeClient()
+
+@pytest.fixture
+def mock_client(_client_template):
+    _client_template.reset()
+    return _client_template
+
+class _StubConsole:
+    """Stands in for the Rich console in tests that don't assert on output."""
+    def print(self, *args, **kwargs):
+        pass
+
+    def status(self, *args, **kwargs):
+        return contextlib.nullcontext()
+
+@pytest.fixture(scope="session")
+def stub_console():
+    return _StubConsole()
 
 @pytest.fixture
-def mock_client():
-    client = MagicMock()
-    # Setup nested mocks
-    client.file_search_stores.create.return_value.name = "stores/test-store"
-    client.files.upload.return_value.name = "files/test-file"
-    client.files.upload.return_value.state.name = "ACTIVE"
-    return client
-
-def test_file_manager_create_store(mock_client):
+def quiet_console(monkeypatch, stub_console):
+    monkeypatch.setattr("deep_research.console", stub_console)
+
+@pytest.fixture
+def agent(make_agent, mock_client):
+    """Quiet agent on the fake client (see make_agent)."""
+    agent = make_agent(quiet=True)
+    agent.client = mock_client
+    return agent
+
+@pytest.fixture
+def fake_fs(monkeypatch):
+    """Every path is a plain file, and the ingestion wait returns at once."""
+    monkeypatch.setattr(os.path, "isdir", lambda p: False)
+    monkeypatch.setattr(os.path, "isfile", lambda p: True)
+    # Skip the 5s ingestion wait; it dominated this module's runtime
+    monkeypatch.setattr("deep_research.time.sleep", lambda s: None)
+
+@pytest.mark.parametrize("paths", [["doc.pdf"], ["a.pdf", "b.pdf"]], ids=["one", "two"])
+@pytest.mark.usefixtures("quiet_console", "fake_fs")
+def test_file_manager_create_store(mock_client, paths):
     """Test that FileManager creates a store and uploads files."""
     fm = FileManager(mock_client)
     
-    # Mock upload helper existence
-    mock_client.file_search_stores.upload_to_file_search_store = MagicMock()
+    store_name = fm.create_store_from_paths(paths)
     
-    with patch("os.path.isdir", return_value=False), \
-         patch("os.path.isfile", return_value=True):
-        
-        store_name = fm.create_store_from_paths(["doc.pdf"])
-        
-        assert store_name == "stores/test-store"
-        # Verify store creation
-        mock_client.file_search_stores.create.assert_called_once()
-        # Verify file upload
-        mock_client.file_search_stores.upload_to_file_search_store.assert_called_once_with(
-            file_search_store_name="stores/test-store",
-            file="doc.pdf"
-        )
+    assert store_name == "stores/test-store"
+    # Verify store creation
+    assert mock_client.file_search_stores.create.call_count == 1
+    # Verify one upload per file, into the new store
+    upload = mock_client.file_search_stores.upload_to_file_search_store
+    assert [c.kwargs for c in upload.call_args_list] == [
+        {"file_search_store_name": "stores/test-store", "file": path} for path in paths
+    ]
 
-def test_file_manager_cleanup(mock_client):
+@pytest.mark.parametrize("doc_names", [[], ["docs/1"], ["docs/1", "docs/2"]], ids=["empty", "one", "two"])
+@pytest.mark.usefixtures("quiet_console")
+def test_file_manager_cleanup(mock_client, doc_names):
     """Test that cleanup lists documents, force-deletes them, and deletes the store."""
     fm = FileManager(mock_client)
     fm.created_stores = ["stores/test-store"]
     
     # Mock document listing
-    mock_doc = MagicMock()
-    mock_doc.name = "docs/test-doc"
-    mock_client.file_search_stores.documents.list.return_value = [mock_doc]
+    mock_client.file_search_stores.documents.list.return_value = [SimpleNamespace(name=n) for n in doc_names]
     
     fm.cleanup()
     
+    stores = mock_client.file_search_stores
     # Verify document listing
-    mock_client.file_search_stores.documents.list.assert_called_with(parent="stores/test-store")
-    # Verify document force deletion
-    mock_client.file_search_stores.documents.delete.assert_called_with(
-        name="docs/test-doc", 
-        config={'force': True}
-    )
+    assert stores.documents.list.call_args.kwargs == {"parent": "stores/test-store"}
+    # Verify document force deletion (order varies: deletes run on a pool)
+    deleted = sorted(c.kwargs["name"] for c in stores.documents.delete.call_args_list)
+    assert deleted == doc_names
+    assert all(c.kwargs["config"] == {'force': True} for c in stores.documents.delete.call_args_list)
     # Verify store deletion
-    mock_client.file_search_stores.delete.assert_called_with(name="stores/test-store")
+    assert stores.delete.call_args.kwargs == {"name": "stores/test-store"}
 
-def test_agent_auto_upload_and_cleanup(mock_client):
+@pytest.mark.usefixtures("quiet_console")
+def test_agent_auto_upload_and_cleanup(agent, mock_client):
     """Test that agent handles auto-upload, modifies prompt, and cleans up."""
-    # Setup config
-    config = MagicMock()
-    config.api_key = "test"
-    
-    agent = DeepResearchAgent(config)
-    agent.client = mock_client
-    # Mock the internal file manager
-    agent.file_manager = MagicMock()
     agent.file_manager.create_store_from_paths.return_value = "stores/temp-store"
     
     # Setup request with upload
     req = ResearchRequest(prompt="Base prompt", upload_paths=["doc.pdf"])
     
-    # Run stream (mocking interaction to avoid loop)
-    mock_client.interactions = MagicMock() # Ensure attribute exists
-    
-    # We expect start_research_stream to call interactions.create
-    # We force an empty stream to return immediately
-    mock_client.interactions.create.return_value = []
+    # We expect start_research_stream to call interactions.create;
+    # the fake client returns an empty stream so it returns immediately
     
     agent.start_research_stream(req)
     
@@ -94,73 +143,112 @@ def test_agent_auto_upload_and_cleanup(mock_client):
     agent.file_manager.cleanup.assert_called_once()
 
 def test_recursive_research():
+    # One patch.multiple per class instead of a patch() per method
     with patch.dict(os.environ, {"GEMINI_API_KEY": "fake_key"}), \
-         patch("deep_research.DeepResearchAgent.start_research_poll") as mock_poll, \
-         patch("deep_research.DeepResearchAgent.start_research_stream") as mock_stream, \
-         patch("deep_research.DeepResearchAgent.analyze_gaps") as mock_gaps, \
-         patch("deep_research.DeepResearchAgent.synthesize_findings") as mock_synth, \
-         patch("deep_research.SessionManager.create_session") as mock_create_session, \
-         patch("deep_research.SessionManager.get_session") as mock_get_session, \
-         patch("deep_research.SessionManager.update_session"):
-
-         # Setup mocks
-    
-             mock_poll.return_value = "interaction_child"
-    
-             mock_stream.return_value = "interaction_root"
-    
-             mock_gaps.return_value = ["Q1", "Q2"]
-    
-             mock_synth.return_value = "Final Report"
-    
-             mock_create_session.return_value = 100
-    
-             # We need to simulate DB state. Root (stream) marks completed. Children (poll) mark running.
-    
-             # But the mocks for poll/stream don't run real code, so we rely on what logic expects.
-    
-             mock_get_session.return_value = {'status': 'completed', 'result': 'Initial Report', 'id': 1}
-    
-    
-    
-             agent = DeepResearchAgent()
-    
-             req = ResearchRequest(prompt="Topic", depth=2)
-    
-    
-    
-             agent.start_recursive_research(req)
-    
-    
-    
-             # Verify logic
-    
-             # Root uses stream
-    
-             assert mock_stream.call_count == 1
-    
-             # 2 Children use poll
-    
-             assert mock_poll.call_count == 2
-    
-    
-    
-             mock_gaps.assert_called_once()
-    
-             mock_synth.assert_called_once()
-    
-             
-    
-             # Verify synthesis args
-    
-             args = mock_synth.call_args
-    
-             assert args[0][0] == "Topic" # original prompt
-    
-             assert args[0][1] == "Initial Report" # main report
-    
-             # Sub reports should be in the list (mocked result from get_session is 'Initial Report' for children too)
-    
-             assert len(args[0][2]) == 2
-    
-    
\ No newline at end of file
+         patch.multiple("deep_research.DeepResearchAgent", start_research_poll=DEFAULT, start_research_stream=DEFAULT,
+                        analyze_gaps=DEFAULT, synthesize_findings=DEFAULT) as agent_mocks, \
+         patch.multiple("deep_research.SessionManager", create_session=DEFAULT, get_session=DEFAULT,
+                        update_session=DEFAULT) as db_mocks:
+        # Setup mocks
+        mock_poll = agent_mocks["start_research_poll"]
+        mock_stream = agent_mocks["start_research_stream"]
+        mock_gaps = agent_mocks["analyze_gaps"]
+        mock_synth = agent_mocks["synthesize_findings"]
+        mock_poll.return_value = "interaction_child"
+        mock_stream.return_value = "interaction_root"
+        mock_gaps.return_value = ["Q1", "Q2"]
+        mock_synth.return_value = "Final Report"
+        db_mocks["create_session"].return_value = 100
+
+        # We need to simulate DB state. Root (stream) marks completed. Children (poll) mark running.
+        # But the mocks for poll/stream don't run real code, so we rely on what logic expects.
+        db_mocks["get_session"].return_value = {'status': 'completed', 'result': 'Initial Report', 'id': 1}
+
+        agent = DeepResearchAgent()
+        req = ResearchRequest(prompt="Topic", depth=2)
+
+        agent.start_recursive_research(req)
+
+    # Verify logic
+    # Root uses stream
+    assert mock_stream.call_count == 1
+    # 2 Children use poll
+    assert mock_poll.call_count == 2
+
+    mock_gaps.assert_called_once()
+    mock_synth.assert_called_once()
+
+    # Verify synthesis args
+    args = mock_synth.call_args
+    assert args[0][0] == "Topic" # original prompt
+    assert args[0][1] == "Initial Report" # main report
+    # Sub reports should be in the list (mocked result from get_session is 'Initial Report' for children too)
+    assert len(args[0][2]) == 2
+
+def test_dedupe_questions(agent):
+    agent._seen_questions.add(agent._question_key("Topic"))
+
+    questions = agent._dedupe_questions(["What is X?", "  what is   x ", "Topic?", "What is Y?"])
+
+    assert questions == ["What is X?", "What is Y?"]
+    # Siblings sharing the set see earlier claims
+    assert agent._dedupe_questions(["What is Y?"]) == []
+
+def test_iter_sizes(tmp_path):
+    (tmp_path / "a.txt").write_bytes(b"x" * 10)
+    (tmp_path / "sub").mkdir()
+    (tmp_path / "sub" / "b.txt").write_bytes(b"x" * 32)
+
+    assert sorted(_iter_sizes(str(tmp_path))) == [10, 32]
+    assert list(_iter_sizes(str(tmp_path / "missing"))) == []
+
+def test_analyze_gaps_prompt(agent, mock_client):
+    mock_client.models.generate_content.return_value.text = '```json\n["Q1"]\n```'
+
+    assert agent.analyze_gaps("Topic", "Report", limit=2) == ["Q1"]
+
+    kwargs = mock_client.models.generate_content.call_args.kwargs
+    # Instructions follow the report in the user content
+    assert kwargs['contents'].startswith("Original Objective: Topic\n\nReport:\nReport\n\nINSTRUCTIONS:")
+    assert "1-2 critical gaps" in kwargs['contents']
+    assert "config" not in kwargs
+
+def test_stream_reconnect_backoff(agent, mock_client):
+    start = MagicMock(event_type="interaction.start", event_id="e1")
+    start.interaction.id = "int_1"
+    done = MagicMock(event_type="interaction.complete", event_id="e2")
+    mock_client.interactions.create.return_value = [start]
+    mock_client.interactions.get.side_effect = [ConnectionError("down"), ConnectionError("down"), [done], MagicMock(outputs=[])]
+
+    with patch("deep_research.time.sleep") as mock_sleep, \
+         patch("deep_research.random.uniform", return_value=0):
+        agent.start_research_stream(ResearchRequest(prompt="Topic"))
+
+    assert [c.args[0] for c in mock_sleep.call_args_list] == [1, 2, 4]
+
+@pytest.mark.parametrize("ceiling", [None, 5.0, 0.5], ids=["default", "configured", "sub-second"])
+def test_poll_adaptive_interval(agent, mock_client, ceiling):
+    if ceiling:
+        agent.config.poll_max_delay = ceiling
+    pending = MagicMock(status="in_progress", id="int_1")
+    done = MagicMock(status="completed", id="int_1")
+    done.outputs = [MagicMock(text="Report")]
+    mock_client.interactions.create.return_value = pending
+    mock_client.interactions.get.side_effect = [pending] * 12 + [done]
+
+    with patch("deep_research.time.sleep") as mock_sleep, \
+         patch("builtins.print"):
+        agent.start_research_poll(ResearchRequest(prompt="Topic"))
+
+    delays = [c.args[0] for c in mock_sleep.call_args_list]
+    ceiling = ceiling or 30.0
+    assert delays[:3] == [min(ceiling, d) for d in (1.0, 1.5, 2.25)]
+    assert max(delays) == ceiling
+    agent.session_manager.update_session.assert_called_with("int_1", "completed", "Report")
+
+def test_label_prompt():
+    assert _label_prompt("line one\nline two") == "line one line two"
+    long_prompt = "a\n" * 100
+    label = _label_prompt(long_prompt)
+    assert len(label) == 100
+    assert label.endswith("...") and "\n" not in label
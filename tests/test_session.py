@@ -1,15 +1,93 @@
+import contextlib
+import itertools
 import pytest
 import os
-from unittest.mock import patch
-from deep_research import SessionManager
+import socket
+import sqlite3
+import uuid
+from datetime import datetime, timedelta
+from unittest.mock import Mock, patch
+from deep_research import SessionManager, StatusBroadcaster, _SQL_LIST
 
 @pytest.fixture
-def test_db(tmp_path):
-    db_file = tmp_path / "test_history.db"
-    return str(db_file)
+def test_db():
+    # Private shared-cache in-memory DB; lives as long as the manager's connection
+    return f"file:test_history_{uuid.uuid4().hex}?mode=memory&cache=shared"
 
-def test_create_session(test_db):
-    mgr = SessionManager(test_db)
+@pytest.fixture
+def mgr(test_db):
+    manager = SessionManager(test_db)
+    yield manager
+    manager.close()
+
+def populate_sessions(mgr, rows):
+    """
+    Bulk-insert (id, status, pid, parent_id[, prompt]) rows in one transaction, skipping create_session round-trips.
+    Later ids get later timestamps.
+    """
+    base = datetime(2025, 1, 1)
+    records = []
+    for sid, status, pid, parent_id, *prompt in rows:
+        stamp = (base + timedelta(seconds=sid)).isoformat()
+        records.append((sid, f"v1_{sid}", prompt[0] if prompt else f"Prompt {sid}", status, stamp, stamp,
+                        pid, parent_id, 1 if parent_id is None else 2))
+    with mgr._conn_lock:
+        mgr.conn.execute("BEGIN")
+        mgr.conn.executemany(
+            "INSERT INTO sessions (id, interaction_id, prompt, status, created_at, updated_at, files, pid, parent_id, depth) "
+            "VALUES (?, ?, ?, ?, ?, ?, '[]', ?, ?, ?)",
+            records,
+        )
+        mgr.conn.execute("COMMIT")
+
+@pytest.fixture(scope="module")
+def mgr_populated():
+    """Read-only tree shared by the module: root 1 -> (2 -> 4, 3), plus unrelated root 5."""
+    manager = SessionManager(f"file:test_history_{uuid.uuid4().hex}?mode=memory&cache=shared")
+    populate_sessions(manager, [
+        (1, "completed", None, None, "Root " + "x" * 200),
+        (2, "completed", None, 1),
+        (3, "completed", None, 1),
+        (4, "completed", None, 2),
+        (5, "completed", None, None),
+    ])
+    yield manager
+    manager.close()
+
+class CountingConnection:
+    """Wraps a real connection and records each statement run through it."""
+    def __init__(self, conn):
+        self._conn = conn
+        self.statements = []
+
+    def __getattr__(self, name):
+        return getattr(self._conn, name)
+
+    @property
+    def row_factory(self):
+        return self._conn.row_factory
+
+    @row_factory.setter
+    def row_factory(self, factory):
+        self._conn.row_factory = factory
+
+    def execute(self, sql, params=()):
+        self.statements.append(sql)
+        return self._conn.execute(sql, params)
+
+    def executemany(self, sql, seq_of_params):
+        self.statements.append(sql)
+        return self._conn.executemany(sql, seq_of_params)
+
+@pytest.fixture
+def counting_mgr(test_db):
+    """Manager whose connection factory hands back a CountingConnection (mgr.conn.statements)."""
+    manager = SessionManager(test_db, connect=lambda *args, **kwargs: CountingConnection(sqlite3.connect(*args, **kwargs)))
+    manager.conn.statements.clear()
+    yield manager
+    manager.close()
+
+def test_create_session(mgr):
     sid = mgr.create_session("v1_123", "Test prompt", ["file1.txt"])
     
     assert sid == 1
@@ -19,61 +97,215 @@ def test_create_session(test_db):
     assert session['status'] == "running"
     assert "file1.txt" in session['files']
 
-def test_update_session(test_db):
-    mgr = SessionManager(test_db)
+@pytest.mark.parametrize("status, result", [
+    ("completed", "Result Text"),
+    ("failed", "API Error: quota"),
+    ("cancelled", None),
+], ids=["completed", "failed", "cancelled"])
+def test_update_session(mgr, status, result):
     mgr.create_session("v1_123", "Test")
     
-    mgr.update_session("v1_123", "completed", "Result Text")
+    mgr.update_session("v1_123", status, result)
     
-    session = mgr.get_session("v1_123")
-    assert session['status'] == "completed"
-    assert session['result'] == "Result Text"
+    session = mgr.get_session("v1_123", include_result=True)
+    assert session['status'] == status
+    assert session['result'] == result
+
+def test_list_sessions(mgr, monkeypatch):
+    # Advance a fake clock one second per call instead of sleeping between inserts
+    ticks = (datetime(2025, 1, 1) + timedelta(seconds=n) for n in itertools.count())
+
+    class TickingDatetime(datetime):
+        @classmethod
+        def now(cls, tz=None):
+            return next(ticks)
 
-def test_list_sessions(test_db):
-    mgr = SessionManager(test_db)
+    monkeypatch.setattr("deep_research.datetime", TickingDatetime)
     mgr.create_session("v1_A", "Test A")
-    import time
-    time.sleep(0.1) 
     mgr.create_session("v1_B", "Test B")
     
     sessions = mgr.list_sessions(limit=5)
     assert len(sessions) == 2
     assert sessions[0]['interaction_id'] == "v1_B"
 
-def test_pid_tracking_alive(test_db):
+@pytest.mark.parametrize("alive", [True, False], ids=["alive", "dead"])
+def test_pid_tracking(mgr, alive):
+    # A dead PID is simulated by making os.kill fail
+    pid = os.getpid() if alive else 99999
+    kill_patch = contextlib.nullcontext() if alive else patch("os.kill", side_effect=OSError)
 
-    mgr = SessionManager(test_db)
+    with kill_patch:
+        mgr.create_session("v1_C", "Test PID", pid=pid)
+        sessions = mgr.list_sessions()
 
-    pid = os.getpid()
+    assert sessions[0]['status'] == ('running' if alive else 'crashed')
+    assert sessions[0]['pid'] == pid
 
-    mgr.create_session("v1_C", "Test PID", pid=pid)
+def test_list_sessions_parent_child(mgr):
+    # Children without their own PID inherit liveness from their parent
+    rows = [(1, "completed", None, None), (2, "running", os.getpid(), None)]
+    rows += [(sid, "running", None, 1) for sid in range(3, 23)]
+    rows += [(sid, "running", None, 2) for sid in range(23, 43)]
+    populate_sessions(mgr, rows)
 
-    
+    statuses = {s['id']: s['status'] for s in mgr.list_sessions(limit=100)}
 
-    sessions = mgr.list_sessions()
+    assert len(statuses) == 42
+    assert {statuses[sid] for sid in range(3, 23)} == {"crashed"}
+    assert {statuses[sid] for sid in range(23, 43)} == {"running"}
 
-    assert sessions[0]['status'] == 'running'
+def test_list_sessions_avoids_n_plus_one_queries(counting_mgr):
+    mgr = counting_mgr
+    populate_sessions(mgr, [(1, "completed", None, None)] + [(sid, "running", None, 1) for sid in range(2, 7)])
+    # The seeding executemany is counted too
+    assert any("INSERT" in sql for sql in mgr.conn.statements)
+    mgr.conn.statements.clear()
 
-    assert sessions[0]['pid'] == pid
+    # No new connection may be opened; everything goes through the counted shared one
+    with patch.object(mgr, "_connect", side_effect=AssertionError("list_sessions reopened the DB")):
+        sessions = mgr.list_sessions(limit=10)
 
+    assert {s['status'] for s in sessions if s['parent_id']} == {"crashed"}
+    selects = [sql for sql in mgr.conn.statements if sql.lstrip().upper().startswith("SELECT")]
+    # One list query plus one grouped parent lookup, however many children there are
+    assert len(selects) <= 2
 
+def test_in_queries_chunk_past_variable_limit(mgr, monkeypatch):
+    # Three finished parents, each with two orphaned children
+    rows = [(sid, "completed", None, None) for sid in (1, 2, 3)]
+    rows += [(sid, "running", None, 1 + (sid - 4) // 2) for sid in range(4, 10)]
+    populate_sessions(mgr, rows)
+    monkeypatch.setattr("deep_research.SQLITE_MAX_VARIABLES", 2)
 
-def test_pid_tracking_dead(test_db):
+    statuses = {s['id']: s['status'] for s in mgr.list_sessions(limit=20)}
+    assert {statuses[sid] for sid in range(4, 10)} == {"crashed"}
 
-    mgr = SessionManager(test_db)
+    descendants = mgr.get_descendants([3, 1, 2])
+    assert [(r[0], r[1]) for r in descendants] == [(4, 1), (5, 1), (6, 2), (7, 2), (8, 3), (9, 3)]
 
-    # Use a likely unused PID (max pid is usually 32k or higher, but let's just mock os.kill)
+def test_list_sessions_uses_index(mgr):
+    plan = " ".join(row[3] for row in mgr.conn.execute("EXPLAIN QUERY PLAN " + _SQL_LIST, (10,)))
+    assert "idx_sessions_updated" in plan
+    assert "TEMP B-TREE" not in plan
 
-    fake_pid = 99999
+def test_init_db_races_on_index_creation(mgr):
+    # Another process creates the index between this one's probe and its CREATE
+    real_execute = mgr.conn.execute
 
-    
+    def execute(sql, *args):
+        if "sqlite_master" in sql:
+            return real_execute("SELECT 1 WHERE 0")
+        return real_execute(sql, *args)
+
+    with patch.object(mgr, "conn", Mock(execute=execute)):
+        mgr._init_db()
+
+def test_append_to_result(mgr):
+    mgr.create_session("v1_F", "Test Append")
+
+    mgr.append_to_result("v1_F", "First")
+    mgr.append_to_result("v1_F", "Second")
+
+    assert mgr.get_session("v1_F", include_result=True)['result'] == "\n\nFirst\n\nSecond"
+
+def test_pid_probe_memoized(mgr):
+    # A running parent and its children all resolve through the same PID
+    populate_sessions(mgr, [(1, "running", 4242, None)] + [(sid, "running", None, 1) for sid in range(2, 6)])
+
+    with patch("os.kill") as kill:
+        statuses = {s['status'] for s in mgr.list_sessions()}
+        assert kill.call_count == 1
+        # Each listing probes afresh; nothing is carried over between calls
+        mgr.list_sessions()
+
+    assert statuses == {"running"}
+    assert kill.call_count == 2
+
+def test_get_session_defers_result(mgr):
+    mgr.create_session("v1_G", "Test Projection")
+    mgr.update_session("v1_G", "completed", "Big report")
+
+    with pytest.raises(IndexError):
+        mgr.get_session("v1_G")['result']
+    assert "result" not in mgr.list_sessions()[0]
+    assert "files" not in mgr.list_sessions()[0]
+    assert mgr.get_session("v1_G", include_result=True)['result'] == "Big report"
+
+def test_init_db_once_per_file(tmp_path):
+    db_path = str(tmp_path / "test_history.db")
+    first = SessionManager(db_path)
+    sid = first.create_session("v1_H", "Test Init")
+
+    with patch.object(SessionManager, "_init_db") as init_db:
+        second = SessionManager(db_path)
+    init_db.assert_not_called()
+    # The second manager still sees the schema and data, in WAL mode
+    assert second.get_session(sid)['interaction_id'] == "v1_H"
+    assert second.conn.execute("PRAGMA journal_mode").fetchone()[0] == "wal"
+    first.close()
+    second.close()
+
+def test_pid_tracking_live_socket(tmp_path):
+    # Status sockets live next to an on-disk DB
+    mgr = SessionManager(str(tmp_path / "test_history.db"))
+    sid = mgr.create_session("v1_E", "Test Socket", pid=99999)
+    broadcaster = StatusBroadcaster(mgr.socket_path(sid), sid)
+    assert broadcaster.start()
+    mgr.broadcaster = broadcaster
+    try:
+        mgr.update_session_interaction_id(sid, "v1_E")
+        # A responsive socket takes precedence over the PID probe
+        with patch("os.kill", side_effect=OSError):
+            sessions = mgr.list_sessions()
+        assert sessions[0]['status'] == 'running'
+    finally:
+        broadcaster.close()
+
+    assert StatusBroadcaster.query(mgr.socket_path(sid)) is None
+
+def test_stale_socket_removed(tmp_path):
+    # A worker killed before close() leaves a bound socket that nobody accepts on
+    mgr = SessionManager(str(tmp_path / "test_history.db"))
+    sid = mgr.create_session("v1_J", "Test Stale", pid=99999)
+    path = mgr.socket_path(sid)
+    os.makedirs(os.path.dirname(path))
+    with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as dead:
+        dead.bind(path)
 
     with patch("os.kill", side_effect=OSError):
+        assert mgr.list_sessions()[0]['status'] == 'crashed'
+    assert not os.path.exists(path)
 
-        mgr.create_session("v1_D", "Test Dead PID", pid=fake_pid)
+    # delete removes the socket of the session it deletes
+    with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as dead:
+        dead.bind(path)
+    assert mgr.delete_session("v1_J")
+    assert not os.path.exists(path)
+    mgr.close()
 
-        sessions = mgr.list_sessions()
+def test_get_descendants(mgr_populated):
+    rows = mgr_populated.get_descendants([1])
+    assert [(r[0], r[1]) for r in rows] == [(2, 1), (3, 1), (4, 2)]
+    assert mgr_populated.get_descendants([5]) == []
+    assert mgr_populated.get_descendants([]) == []
+
+def test_child_counts(mgr_populated, monkeypatch):
+    assert mgr_populated.child_counts([1, 2, 3, 5]) == {1: 2, 2: 1}
+    assert mgr_populated.child_counts([]) == {}
+    # Chunked past the variable limit, still one entry per parent
+    monkeypatch.setattr("deep_research.SQLITE_MAX_VARIABLES", 1)
+    assert mgr_populated.child_counts([1, 2]) == {1: 2, 2: 1}
 
-        
+def test_get_roots(mgr_populated):
+    roots = mgr_populated.get_roots()
+    # Newest root first; children are excluded
+    assert [r[0] for r in roots] == [5, 1]
+    assert len(roots[1][2]) == 101
+    # The connection lock is released before the caller walks the rows
+    assert not mgr_populated._conn_lock.locked()
 
-    assert sessions[0]['status'] == 'crashed'
+def test_list_sessions_read_only(mgr_populated):
+    sessions = mgr_populated.list_sessions(limit=3)
+    assert [s['id'] for s in sessions] == [5, 4, 3]
+    assert {s['status'] for s in sessions} == {"completed"}
+    assert all(type(s) is dict for s in sessions)